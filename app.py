@@ -5,6 +5,8 @@ import sys
 import os
 import io  # To handle SVG rendering potential issues
 import math # Import math if used in BPlusTree or other modules
+from concurrent.futures import ThreadPoolExecutor # Background saves
+from functools import partial # Prebound widget builders for the insert form
 
 # --- Add project root to Python path ---
 # This allows importing from the 'database' package
@@ -24,8 +26,16 @@ except ModuleNotFoundError as e:
     st.error("Ensure 'app.py' is in the project root directory and the 'database' package exists with '__init__.py'.")
     st.stop() # Stop execution if core modules can't be imported
 
+try:
+    import pygraphviz # Optional: lays out graphs in-process via libgvc instead of spawning `dot`
+except ImportError:
+    pygraphviz = None
+
 # --- Helper Functions ---
 
+# Pandas dtype for each supported schema type (see parse_schema)
+PANDAS_DTYPES = {int: "int64", float: "float64", bool: "bool", str: "string"}
+
 def parse_schema(schema_str: str) -> dict:
     """Parses a schema string 'col1:type1, col2:type2' into a dict."""
     schema = {}
@@ -46,19 +56,127 @@ def parse_schema(schema_str: str) -> dict:
         st.error(f"Invalid schema format. Use 'col1:type1, col2:type2'. Error: {e}")
         return None # Return None on error
 
-def get_widget_value(widget_func, label, schema_type, default=None):
-    """Gets value from appropriate streamlit widget based on type."""
+def widget_for(schema_type):
+    """Returns a Streamlit widget function pre-bound to the defaults for a schema type; call it with the label."""
     if schema_type == int:
-        return widget_func(label, value=default if isinstance(default, int) else 0, step=1)
+        return partial(st.number_input, value=0, step=1)
     elif schema_type == float:
-        return widget_func(label, value=default if isinstance(default, float) else 0.0, step=0.1)
+        return partial(st.number_input, value=0.0, step=0.1)
     elif schema_type == bool:
         # Represent bool as selectbox for clarity, handling None storage issue
-        options = [True, False]
-        default_index = options.index(default) if default in options else 0
-        return widget_func(label, options=options, index=default_index)
+        return partial(st.selectbox, options=[True, False], index=0)
     else: # Default to string
-        return widget_func(label, value=default if isinstance(default, str) else "")
+        return partial(st.text_input, value="")
+
+def get_form_widgets(db_name, table):
+    """
+    Returns [(col_name, label, widget_builder)] for a table's insert form,
+    built once per table and schema and reused on every rerun.
+    """
+    cache = st.session_state.widget_cache
+    cache_key = (db_name, table.name)
+    cached = cache.get(cache_key)
+    if cached and cached[0] is table.schema:
+        return cached[1]
+    widgets = [(col_name, f"{col_name} ({col_type.__name__})", widget_for(col_type)) for col_name, col_type in table.schema.items()]
+    cache[cache_key] = (table.schema, widgets)
+    return widgets
+
+def records_to_dataframe(records, schema):
+    """Builds a DataFrame with one typed column per schema field, in schema order."""
+    df = pd.DataFrame.from_records(records, columns=list(schema), coerce_float=False)
+    return df.astype({col_name: PANDAS_DTYPES[col_type] for col_name, col_type in schema.items()})
+
+def dot_to_svg(dot):
+    """
+    Renders a graphviz.Digraph to SVG text. Uses pygraphviz when it is installed,
+    which avoids starting a `dot` subprocess per render; otherwise falls back to dot.pipe().
+    """
+    if pygraphviz is not None:
+        return pygraphviz.AGraph(string=dot.source).draw(format='svg', prog='dot').decode('utf-8')
+    return dot.pipe(format='svg').decode('utf-8')
+
+def render_tree_svg(db_name, table):
+    """
+    Returns the SVG markup for a table's B+ Tree, re-running Graphviz only when
+    the tree's version changed since the last render in this session.
+    """
+    cache = st.session_state.svg_cache
+    cache_key = (db_name, table.name)
+    cached = cache.get(cache_key)
+    if cached and cached[0] == table.data.version:
+        return cached[1]
+    dot = table.data.visualize_tree()
+    if not dot:
+        return None
+    svg = dot_to_svg(dot)
+    cache[cache_key] = (table.data.version, svg)
+    return svg
+
+def get_table_view(db_name, table):
+    """
+    Returns the per-session view cache for a table: a dict holding the record
+    count and the DataFrames of pages already rendered. It is rebuilt whenever
+    the tree's version changes, so inserts and deletes invalidate it.
+    """
+    cache = st.session_state.df_cache
+    cache_key = (db_name, table.name)
+    cached = cache.get(cache_key)
+    if cached and cached[0] == table.data.version:
+        return cached[1]
+    view = {"total": table.count(), "pages": {}}
+    cache[cache_key] = (table.data.version, view)
+    return view
+
+def page_dataframe(view, table, offset):
+    """Returns the DataFrame for the page starting at `offset`, building it on first use."""
+    df = view["pages"].get(offset)
+    if df is None:
+        page_records, _ = table.get_range_by_offset(offset, GET_ALL_PAGE_SIZE)
+        df = view["pages"][offset] = records_to_dataframe(page_records, table.schema)
+    return df
+
+@st.cache_resource
+def get_io_pool():
+    """Single worker thread shared by the server for disk writes (keeps saves ordered)."""
+    return ThreadPoolExecutor(max_workers=1)
+
+def invalidate_listings():
+    """
+    Marks the database/table listings as stale after a create, delete or load.
+    The renders keyed by table name go too: a new tree under an old name can
+    have the same version.
+    """
+    st.session_state.listing_cache = {}
+    st.session_state.svg_cache = {}
+    st.session_state.df_cache = {}
+
+if 'save_future' not in st.session_state:
+    st.session_state.save_future = None # Pending background save, if any
+
+if 'svg_cache' not in st.session_state:
+    st.session_state.svg_cache = {} # {(db, table): (tree_version, svg)}
+
+if 'widget_cache' not in st.session_state:
+    st.session_state.widget_cache = {} # {(db, table): (schema, [(col, label, widget_builder)])}
+
+if 'df_cache' not in st.session_state:
+    st.session_state.df_cache = {} # {(db, table): (tree_version, {"total": n, "pages": {offset: df}})}
+
+def list_databases_cached():
+    """Returns database names, only asking the manager again after a schema change."""
+    cache = st.session_state.listing_cache
+    if 'dbs' not in cache:
+        cache['dbs'], _ = db_manager.list_databases()
+    return cache['dbs']
+
+def list_tables_cached(db_name):
+    """Returns (table_names, success) for db_name, cached until the next schema change."""
+    cache = st.session_state.listing_cache
+    key = ('tables', db_name)
+    if key not in cache:
+        cache[key] = db_manager.list_tables(db_name)
+    return cache[key]
 
 
 # --- Initialize Session State ---
@@ -72,11 +190,17 @@ if 'selected_db' not in st.session_state:
 if 'selected_table' not in st.session_state:
     st.session_state.selected_table = None
 
+# Listings only change on create/delete/load, so they are cached per session
+# and cleared by invalidate_listings instead of re-queried on every rerun.
+if 'listing_cache' not in st.session_state:
+    st.session_state.listing_cache = {}
+
 db_manager = st.session_state.db_manager
 
 # --- Constants ---
 SAVE_DIR = "saved_data"
 DEFAULT_SAVE_FILE = os.path.join(SAVE_DIR, "sports_db.pkl")
+GET_ALL_PAGE_SIZE = 100 # Records rendered per page in the Get All tab
 
 # ==================================
 # --- Sidebar - DB/Table Management ---
@@ -84,10 +208,13 @@ DEFAULT_SAVE_FILE = os.path.join(SAVE_DIR, "sports_db.pkl")
 st.sidebar.header("Database Management")
 
 # --- DB Operations ---
-db_names, _ = db_manager.list_databases()
-st.session_state.selected_db = st.sidebar.selectbox(
+db_names = list_databases_cached()
+# Bind the selections to locals once; st.session_state is only written back when they change
+sel_db = st.sidebar.selectbox(
     "Select Database", db_names, index=db_names.index(st.session_state.selected_db) if st.session_state.selected_db in db_names else 0, key="db_select"
 )
+if sel_db != st.session_state.selected_db:
+    st.session_state.selected_db = sel_db
 
 col1, col2 = st.sidebar.columns(2)
 with col1:
@@ -95,18 +222,19 @@ with col1:
     if st.button("Create DB", key="create_db_btn"):
         if new_db_name:
             msg, success = db_manager.create_database(new_db_name)
-            if success: st.sidebar.success(f"DB '{new_db_name}' created.") ; st.rerun()
+            if success: invalidate_listings(); st.sidebar.success(f"DB '{new_db_name}' created.") ; st.rerun()
             else: st.sidebar.error(msg)
         else:
             st.sidebar.warning("Enter a database name.")
 
 with col2:
-    if st.session_state.selected_db:
-        if st.button(f"Delete '{st.session_state.selected_db}'", key="delete_db_btn"):
-            if st.sidebar.checkbox(f"Confirm deletion of {st.session_state.selected_db}?", key="confirm_del_db"):
-                msg, success = db_manager.delete_database(st.session_state.selected_db)
+    if sel_db:
+        if st.button(f"Delete '{sel_db}'", key="delete_db_btn"):
+            if st.sidebar.checkbox(f"Confirm deletion of {sel_db}?", key="confirm_del_db"):
+                msg, success = db_manager.delete_database(sel_db)
                 if success:
-                    st.sidebar.success(f"DB '{st.session_state.selected_db}' deleted.")
+                    invalidate_listings()
+                    st.sidebar.success(f"DB '{sel_db}' deleted.")
                     st.session_state.selected_db = None # Reset selection
                     st.session_state.selected_table = None
                     st.rerun() # Reload to update selectbox
@@ -115,14 +243,16 @@ with col2:
 st.sidebar.divider()
 
 # --- Table Operations (only if DB selected) ---
-if st.session_state.selected_db:
-    st.sidebar.subheader(f"Tables in '{st.session_state.selected_db}'")
-    table_names, success = db_manager.list_tables(st.session_state.selected_db)
+if sel_db:
+    st.sidebar.subheader(f"Tables in '{sel_db}'")
+    table_names, success = list_tables_cached(sel_db)
     if not success: table_names = [] # Handle case where DB might disappear unexpectedly
 
-    st.session_state.selected_table = st.sidebar.selectbox(
+    sel_table = st.sidebar.selectbox(
         "Select Table", table_names, index=table_names.index(st.session_state.selected_table) if st.session_state.selected_table in table_names else 0, key="table_select"
     )
+    if sel_table != st.session_state.selected_table:
+        st.session_state.selected_table = sel_table
 
     with st.sidebar.expander("Create New Table"):
         new_table_name = st.text_input("New Table Name", key="new_table_name_input")
@@ -139,27 +269,29 @@ if st.session_state.selected_db:
                         st.error(f"Search key '{search_key_col}' not found in provided schema keys: {list(schema.keys())}")
                     else:
                          msg, success = db_manager.create_table(
-                             st.session_state.selected_db,
+                             sel_db,
                              new_table_name,
                              schema,
                              order=btree_order,
                              search_key=search_key_col
                          )
-                         if success: st.success(f"Table '{new_table_name}' created."); st.rerun()
+                         if success: invalidate_listings(); st.success(f"Table '{new_table_name}' created."); st.rerun()
                          else: st.error(msg)
             else:
                 st.warning("Please fill in all fields for the new table.")
 
-    if st.session_state.selected_table:
-         if st.sidebar.button(f"Delete '{st.session_state.selected_table}' Table", key="delete_table_btn"):
-              if st.sidebar.checkbox(f"Confirm deletion of {st.session_state.selected_table}?", key="confirm_del_tbl"):
-                    msg, success = db_manager.delete_table(st.session_state.selected_db, st.session_state.selected_table)
+    if sel_table:
+         if st.sidebar.button(f"Delete '{sel_table}' Table", key="delete_table_btn"):
+              if st.sidebar.checkbox(f"Confirm deletion of {sel_table}?", key="confirm_del_tbl"):
+                    msg, success = db_manager.delete_table(sel_db, sel_table)
                     if success:
-                        st.sidebar.success(f"Table '{st.session_state.selected_table}' deleted.")
+                        invalidate_listings()
+                        st.sidebar.success(f"Table '{sel_table}' deleted.")
                         st.session_state.selected_table = None # Reset selection
                         st.rerun() # Reload to update selectbox
                     else: st.sidebar.error(msg)
 else:
+    sel_table = st.session_state.selected_table
     st.sidebar.info("Select or create a database to manage tables.")
 
 st.sidebar.divider()
@@ -170,13 +302,19 @@ save_load_path = st.sidebar.text_input("Save/Load File Path", value=DEFAULT_SAVE
 col3, col4 = st.sidebar.columns(2)
 with col3:
     if st.button("Save State", key="save_db_btn"):
-        msg, success = db_manager.save_to_disk(save_load_path)
-        if success: st.sidebar.success("DB state saved.")
-        else: st.sidebar.error(msg)
+        # Encode here, on the thread that modifies the tables, then write the finished
+        # bytes on the I/O thread so the UI doesn't block on disk writes + fsync
+        chunks, success = db_manager.prepare_save(save_load_path)
+        if success:
+            st.session_state.save_future = get_io_pool().submit(db_manager.write_save, save_load_path, chunks)
+        else: st.sidebar.error(chunks)
 with col4:
      if st.button("Load State", key="load_db_btn"):
+         if st.session_state.save_future is not None:
+             st.session_state.save_future.result() # Don't read a file that is still being written
          msg, success = db_manager.load_from_disk(save_load_path)
          if success:
+             invalidate_listings()
              st.sidebar.success("DB state loaded.")
              # Reset selections as loaded state might not have them
              st.session_state.selected_db = None
@@ -184,179 +322,243 @@ with col4:
              st.rerun() # Force rerun to update UI with loaded state
          else: st.sidebar.error(msg)
 
+# Report a background save once it has finished
+save_future = st.session_state.save_future
+if save_future is not None:
+    if save_future.done():
+        st.session_state.save_future = None
+        msg, success = save_future.result()
+        if success: st.toast("DB state saved.")
+        else: st.sidebar.error(msg)
+    else:
+        st.sidebar.info("Saving DB state in the background...")
+
+
+# ==========================
+# --- Tab Fragments ---
+# ==========================
+# Each tab is an st.fragment: a form submit or button click inside a tab only
+# reruns that tab, not the sidebar listings and the rest of the page.
+@st.fragment
+def insert_tab(current_table, db_name):
+    """Form for inserting a single record."""
+    st.subheader("Insert New Record")
+    # One status slot for this tab: each result replaces the previous message in place
+    status = st.empty()
+    with st.form("insert_form"):
+        record_input = {}
+        for col_name, label, build_widget in get_form_widgets(db_name, current_table):
+            record_input[col_name] = build_widget(label)
+
+        submitted = st.form_submit_button("Insert Record")
+        if submitted:
+            # Convert widget values (e.g. bool from selectbox) to the schema types
+            record_input = current_table.coerce_record(record_input)
+
+            # Attempt insertion
+            success, msg = current_table.insert(record_input)
+            if success:
+                status.success("Record inserted successfully!")
+            else:
+                status.error(f"Insertion Failed: {msg}")
+
+    st.subheader("Bulk Insert from CSV")
+    uploaded = st.file_uploader("CSV with one column per schema field", type="csv", key="bulk_csv")
+    if uploaded is not None and st.button("Bulk Insert", key="bulk_insert_btn"):
+        try:
+            schema = current_table.schema
+            # Empty cells stay '' in str columns; in the others they are missing values
+            df = pd.read_csv(uploaded, dtype={col_name: PANDAS_DTYPES[col_type] for col_name, col_type in schema.items()},
+                             keep_default_na=False, na_values={col_name: [""] for col_name, col_type in schema.items() if col_type is not str})
+            missing = df.index[df.isna().any(axis=1)]
+            if len(missing):
+                raise ValueError(f"missing or NaN values in data row(s) {', '.join(str(i + 1) for i in missing[:10])}")
+            # Coercion turns NumPy scalars back into the plain Python types the schema expects
+            records = [current_table.coerce_record(row) for row in df.to_dict("records")]
+        except Exception as e:
+            status.error(f"Could not read CSV: {e}")
+        else:
+            success, msg = current_table.bulk_insert(records)
+            if success:
+                status.success(f"Inserted {len(records)} records.")
+            else:
+                status.error(f"Bulk Insert Failed: {msg}")
+
+@st.fragment
+def get_record_tab(current_table):
+    """Point lookup by search key."""
+    st.subheader("Get Record by ID")
+    search_key_type = current_table.schema.get(current_table.search_key, str) # Default to str if somehow missing
+    with st.form("get_form"):
+         record_id_str = st.text_input(f"Enter {current_table.search_key} (ID)")
+         submitted = st.form_submit_button("Get Record")
+         if submitted:
+             if not record_id_str:
+                 st.warning("Please enter a Record ID.")
+             else:
+                try:
+                    # Try converting ID to the expected type
+                    record_id = search_key_type(record_id_str)
+                    record, found = current_table.get(record_id)
+                    if found:
+                        st.success(f"Record found for ID {record_id}:")
+                        st.json(record)
+                    else:
+                        st.warning(f"Record not found for ID {record_id}.")
+                except ValueError:
+                    st.error(f"Invalid ID format. Expected type: {search_key_type.__name__}")
+                except Exception as e:
+                    st.error(f"An error occurred: {e}")
+
+@st.fragment
+def get_all_tab(current_table, db_name):
+    """Lists every record in search-key order, one page at a time."""
+    st.subheader("Get All Records")
+    if st.button("Load All Records", key="get_all_btn"):
+        st.session_state.get_all_table = current_table.name
+    if st.session_state.get("get_all_table") != current_table.name:
+        return
+
+    view = get_table_view(db_name, current_table)
+    total = view["total"]
+    if total == 0:
+        st.info("Table is empty.")
+        return
+    num_pages = -(-total // GET_ALL_PAGE_SIZE) # ceil division
+    page = st.number_input(f"Page (of {num_pages})", min_value=1, max_value=num_pages, value=1, step=1, key="get_all_page")
+    offset = (int(page) - 1) * GET_ALL_PAGE_SIZE
+    # Only the visible page is turned into a DataFrame, and reused until the table changes
+    df = page_dataframe(view, current_table, offset)
+    st.write(f"Found {total} records, showing {offset + 1}-{offset + len(df)}:")
+    st.dataframe(df)
+
+@st.fragment
+def range_query_tab(current_table):
+    """Inclusive range scan over the search key."""
+    st.subheader("Range Query")
+    search_key_type = current_table.schema.get(current_table.search_key, str)
+    with st.form("range_form"):
+        col_range1, col_range2 = st.columns(2)
+        with col_range1:
+             start_key_str = st.text_input(f"Start {current_table.search_key}")
+        with col_range2:
+             end_key_str = st.text_input(f"End {current_table.search_key}")
+
+        submitted = st.form_submit_button("Run Range Query")
+        if submitted:
+            if not start_key_str or not end_key_str:
+                st.warning("Please enter both Start and End keys.")
+            else:
+                try:
+                     start_key = search_key_type(start_key_str)
+                     end_key = search_key_type(end_key_str)
+                     if start_key > end_key:
+                          st.warning("Start key cannot be greater than End key.")
+                     else:
+                          results, success = current_table.range_query(start_key, end_key)
+                          if success:
+                               st.write(f"Found {len(results)} records in range [{start_key} - {end_key}]:")
+                               if results:
+                                    df = records_to_dataframe(results, current_table.schema)
+                                    st.dataframe(df)
+                               else:
+                                    st.info("No records found in this range.")
+                          else:
+                               st.error("Range query failed.")
+                except ValueError:
+                    st.error(f"Invalid key format. Expected type: {search_key_type.__name__}")
+                except Exception as e:
+                    st.error(f"An error occurred: {e}")
+
+@st.fragment
+def delete_tab(current_table):
+    """Deletes a record by search key."""
+    st.subheader("Delete Record by ID")
+    status = st.empty()
+    search_key_type = current_table.schema.get(current_table.search_key, str)
+    with st.form("delete_form"):
+        record_id_del_str = st.text_input(f"Enter {current_table.search_key} (ID) to Delete")
+        submitted = st.form_submit_button("Delete Record")
+        if submitted:
+            if not record_id_del_str:
+                status.warning("Please enter a Record ID.")
+            else:
+                try:
+                    record_id_del = search_key_type(record_id_del_str)
+                    # Optional: Add confirmation checkbox inside form
+                    # confirm_del = st.checkbox("Confirm Deletion?")
+                    # if confirm_del:
+                    success, msg = current_table.delete(record_id_del)
+                    if success:
+                        status.success(f"Record with ID {record_id_del} deleted successfully!")
+                    else:
+                        status.error(f"Deletion Failed: {msg}")
+                    # else: st.warning("Deletion not confirmed.")
+                except ValueError:
+                    status.error(f"Invalid ID format. Expected type: {search_key_type.__name__}")
+                except Exception as e:
+                    status.error(f"An error occurred: {e}")
+
+@st.fragment
+def visualize_tab(current_table, db_name):
+    """Renders the table's B+ Tree index with Graphviz."""
+    st.subheader("Visualize B+ Tree Index")
+    if st.button("Generate Visualization", key="viz_btn"):
+         if current_table and isinstance(current_table.data, BPlusTree):
+             st.write("Generating tree... (may take a moment for large trees)")
+             try:
+                  # Render to SVG (cached until the tree changes) and display using st.image
+                  svg = render_tree_svg(db_name, current_table)
+                  if svg:
+                      st.image(svg, use_container_width=True)
+                  else:
+                      st.warning("Could not generate visualization object (tree might be empty or error occurred).")
+             except graphviz.backend.execute.ExecutableNotFound:
+                 st.error("Graphviz executable not found in system PATH. Please install Graphviz (https://graphviz.org/download/) and add it to PATH.")
+             except Exception as e:
+                 st.error(f"An error occurred during visualization: {e}")
+         else:
+             st.error("Cannot visualize. Invalid table data structure.")
+
 
 # ============================
 # --- Main Area - Operations ---
 # ============================
 st.title("B+ Tree DBMS Interface")
 
-if not st.session_state.selected_db:
+if not sel_db:
     st.info("⬅️ Select or Create a Database in the sidebar to begin.")
-elif not st.session_state.selected_table:
-    st.info(f"⬅️ Select or Create a Table within the '{st.session_state.selected_db}' database in the sidebar.")
+elif not sel_table:
+    st.info(f"⬅️ Select or Create a Table within the '{sel_db}' database in the sidebar.")
 else:
     # Get selected table object
-    current_table, success = db_manager.get_table(st.session_state.selected_db, st.session_state.selected_table)
+    current_table, success = db_manager.get_table(sel_db, sel_table)
 
     if not success or not current_table:
-        st.error(f"Could not load table '{st.session_state.selected_table}'. It might have been deleted.")
+        st.error(f"Could not load table '{sel_table}'. It might have been deleted.")
         st.session_state.selected_table = None # Reset selection
         st.stop()
 
     st.header(f"Table: `{current_table.name}`")
-    st.caption(f"Database: `{st.session_state.selected_db}` | B+Tree Order: `{current_table.order}` | Search Key: `{current_table.search_key}`")
+    st.caption(f"Database: `{sel_db}` | B+Tree Order: `{current_table.order}` | Search Key: `{current_table.search_key}`")
     st.json(current_table.schema, expanded=False) # Show schema collapsed
 
     tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["Insert", "Get Record", "Get All", "Range Query", "Delete", "Visualize Tree"])
 
-    # --- Insert Tab ---
     with tab1:
-        st.subheader("Insert New Record")
-        with st.form("insert_form"):
-            record_input = {}
-            for col_name, col_type in current_table.schema.items():
-                # Use helper to create appropriate widget
-                record_input[col_name] = get_widget_value(st.text_input if col_type==str else st.number_input if col_type in [int, float] else st.selectbox, f"{col_name} ({col_type.__name__})", col_type)
-
-            submitted = st.form_submit_button("Insert Record")
-            if submitted:
-                # Convert bool from selectbox if needed
-                for col_name, col_type in current_table.schema.items():
-                    if col_type == bool:
-                        # Ensure value is actual boolean
-                        record_input[col_name] = bool(record_input[col_name])
-
-                # Attempt insertion
-                success, msg = current_table.insert(record_input)
-                if success:
-                    st.success("Record inserted successfully!")
-                else:
-                    st.error(f"Insertion Failed: {msg}")
+        insert_tab(current_table, sel_db)
 
-    # --- Get Record Tab ---
     with tab2:
-        st.subheader("Get Record by ID")
-        search_key_type = current_table.schema.get(current_table.search_key, str) # Default to str if somehow missing
-        with st.form("get_form"):
-             record_id_str = st.text_input(f"Enter {current_table.search_key} (ID)")
-             submitted = st.form_submit_button("Get Record")
-             if submitted:
-                 if not record_id_str:
-                     st.warning("Please enter a Record ID.")
-                 else:
-                    try:
-                        # Try converting ID to the expected type
-                        record_id = search_key_type(record_id_str)
-                        record, found = current_table.get(record_id)
-                        if found:
-                            st.success(f"Record found for ID {record_id}:")
-                            st.json(record)
-                        else:
-                            st.warning(f"Record not found for ID {record_id}.")
-                    except ValueError:
-                        st.error(f"Invalid ID format. Expected type: {search_key_type.__name__}")
-                    except Exception as e:
-                        st.error(f"An error occurred: {e}")
-
-    # --- Get All Tab ---
-    with tab3:
-        st.subheader("Get All Records")
-        if st.button("Load All Records", key="get_all_btn"):
-            all_records, success = current_table.get_all()
-            if success:
-                st.write(f"Found {len(all_records)} records:")
-                # Use Pandas DataFrame for nice table display
-                if all_records:
-                     df = pd.DataFrame(all_records)
-                     st.dataframe(df)
-                else:
-                     st.info("Table is empty.")
-            else:
-                 st.error("Failed to retrieve all records.")
+        get_record_tab(current_table)
 
+    with tab3:
+        get_all_tab(current_table, sel_db)
 
-    # --- Range Query Tab ---
     with tab4:
-        st.subheader("Range Query")
-        search_key_type = current_table.schema.get(current_table.search_key, str)
-        with st.form("range_form"):
-            col_range1, col_range2 = st.columns(2)
-            with col_range1:
-                 start_key_str = st.text_input(f"Start {current_table.search_key}")
-            with col_range2:
-                 end_key_str = st.text_input(f"End {current_table.search_key}")
-
-            submitted = st.form_submit_button("Run Range Query")
-            if submitted:
-                if not start_key_str or not end_key_str:
-                    st.warning("Please enter both Start and End keys.")
-                else:
-                    try:
-                         start_key = search_key_type(start_key_str)
-                         end_key = search_key_type(end_key_str)
-                         if start_key > end_key:
-                              st.warning("Start key cannot be greater than End key.")
-                         else:
-                              results, success = current_table.range_query(start_key, end_key)
-                              if success:
-                                   st.write(f"Found {len(results)} records in range [{start_key} - {end_key}]:")
-                                   if results:
-                                        df = pd.DataFrame(results)
-                                        st.dataframe(df)
-                                   else:
-                                        st.info("No records found in this range.")
-                              else:
-                                   st.error("Range query failed.")
-                    except ValueError:
-                        st.error(f"Invalid key format. Expected type: {search_key_type.__name__}")
-                    except Exception as e:
-                        st.error(f"An error occurred: {e}")
-
-    # --- Delete Tab ---
+        range_query_tab(current_table)
+
     with tab5:
-         st.subheader("Delete Record by ID")
-         search_key_type = current_table.schema.get(current_table.search_key, str)
-         with st.form("delete_form"):
-             record_id_del_str = st.text_input(f"Enter {current_table.search_key} (ID) to Delete")
-             submitted = st.form_submit_button("Delete Record")
-             if submitted:
-                 if not record_id_del_str:
-                     st.warning("Please enter a Record ID.")
-                 else:
-                     try:
-                         record_id_del = search_key_type(record_id_del_str)
-                         # Optional: Add confirmation checkbox inside form
-                         # confirm_del = st.checkbox("Confirm Deletion?")
-                         # if confirm_del:
-                         success, msg = current_table.delete(record_id_del)
-                         if success:
-                             st.success(f"Record with ID {record_id_del} deleted successfully!")
-                         else:
-                             st.error(f"Deletion Failed: {msg}")
-                         # else: st.warning("Deletion not confirmed.")
-                     except ValueError:
-                         st.error(f"Invalid ID format. Expected type: {search_key_type.__name__}")
-                     except Exception as e:
-                         st.error(f"An error occurred: {e}")
-
-    # --- Visualize Tab ---
+        delete_tab(current_table)
+
     with tab6:
-        st.subheader("Visualize B+ Tree Index")
-        if st.button("Generate Visualization", key="viz_btn"):
-             if current_table and isinstance(current_table.data, BPlusTree):
-                 st.write("Generating tree... (may take a moment for large trees)")
-                 dot = current_table.data.visualize_tree()
-                 if dot:
-                     try:
-                          # Render to SVG and display using st.image
-                          # Using BytesIO avoids temporary file creation
-                          svg_bytes = dot.pipe(format='svg')
-                          st.image(svg_bytes.decode('utf-8'), use_container_width=True)
-                     except graphviz.backend.execute.ExecutableNotFound:
-                         st.error("Graphviz executable not found in system PATH. Please install Graphviz (https://graphviz.org/download/) and add it to PATH.")
-                     except Exception as e:
-                         st.error(f"An error occurred during visualization: {e}")
-                 else:
-                     st.warning("Could not generate visualization object (tree might be empty or error occurred).")
-             else:
-                 st.error("Cannot visualize. Invalid table data structure.")
\ No newline at end of file
+        visualize_tab(current_table, sel_db)
@@ -1,303 +1,655 @@
 #db_management_system/database/bplustree.py
-import bisect
+# Module-level aliases: hot paths call these without the `bisect.` attribute lookup
+from bisect import bisect_left as _bisect_left, bisect_right as _bisect_right
+from copy import deepcopy
 import math
-from typing import Any, List, Optional, Tuple, Union
+from operator import itemgetter
+from typing import Any, Iterator, List, Optional, Tuple, Union
 
 NodeValue = Union['BPlusTreeNode', Any] # Child node or actual data
+Path = List[Tuple['BPlusTreeNode', int]] # Ancestors from the root down, each with the index of the child taken
+
+# Set to True to run BPlusTree._check_invariants() after every insert and delete
+_DEBUG = False
+# Most nodes freed by merges that a tree keeps for reuse by later splits
+_NODE_POOL_LIMIT = 64
+
+class BPlusTreeError(ValueError):
+    """Invalid use of a BPlusTree (bad order, duplicate keys in a batch, bulk load into a non-empty tree)."""
 
 class BPlusTreeNode:
-    """Represents a node in the B+ Tree (Internal or Leaf)."""
-    # (Constructor and __repr__ remain the same as the 'fresh start' version)
-    def __init__(self, order: int, parent: Optional['BPlusTreeNode'] = None, is_leaf: bool = False):
+    """
+    Represents a node in the B+ Tree (Internal or Leaf).
+
+    Keys are kept in a plain sorted Python list and located with the C-level
+    bisect functions, so any orderable search key (int, float or str) works.
+    Attributes live in __slots__: no per-node __dict__, and faster attribute
+    access on the traversal paths. Nodes do not point to their parent; the
+    tree records the descent path (see Path) when an operation may rebalance.
+    """
+    __slots__ = ('order', 'keys', 'values', 'is_leaf', 'next_leaf')
+
+    def __init__(self, order: int, is_leaf: bool = False):
         self.order: int = order
-        self.parent: Optional[BPlusTreeNode] = parent
         self.keys: List[Any] = []
         self.values: List[NodeValue] = [] # Child nodes for Internal, data values for Leaf
         self.is_leaf: bool = is_leaf
         self.next_leaf: Optional[BPlusTreeNode] = None
 
+    def __getstate__(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state: dict) -> None:
+        """Accepts the dict written by __getstate__ and the __dict__ of older nodes (whose `parent` is dropped)."""
+        for name, value in state.items():
+            if name != 'parent': setattr(self, name, value)
+
     def __repr__(self) -> str:
         key_str = ", ".join(map(str, self.keys))
         return f"Node({'L' if self.is_leaf else 'I'}, K:[{key_str}])"
 
-    def is_full(self) -> bool:
-        """Node has max number of keys (order - 1)."""
-        return len(self.keys) == self.order - 1
-
-    def has_excess_keys(self, min_keys: int) -> bool:
-        """Node has more than the minimum number of keys."""
-        return len(self.keys) > min_keys
-
-    def is_underflow(self, min_keys: int) -> bool:
-        """Node has less than the minimum number of keys."""
-        if self.parent is None: return False
-        return len(self.keys) < min_keys
-
 class BPlusTree:
     """B+ Tree Implementation (Optimized Node Lookups)."""
     def __init__(self, order: int = 4):
-        if order < 3: raise ValueError("B+ Tree order must be at least 3")
+        """Pass `order=BPlusTree.auto_order()` to size each node's key array to one cache line."""
+        if order < 3: raise BPlusTreeError("B+ Tree order must be at least 3")
         self.order: int = order
         self.root: BPlusTreeNode = BPlusTreeNode(order, is_leaf=True)
-        self._min_keys: int = math.ceil(self.order / 2) - 1 # Stored min keys
+        # Fill bounds, computed once; call sites compare len(node.keys) against them directly
+        self._min_keys: int = math.ceil(self.order / 2) - 1
+        self._max_keys: int = self.order - 1
+        self.version: int = 0 # Bumped on every successful insert/update/delete (cache invalidation)
+        self._rightmost_leaf: BPlusTreeNode = self.root # Tail of the leaf chain, for append fast path
+        self._free_nodes: List[BPlusTreeNode] = [] # Nodes released by merges, reused by splits
+
+    def __getstate__(self) -> dict:
+        """
+        Pickle the contents as two sorted columns instead of the node graph: fewer
+        objects to write and no deep recursion along the leaf chain. __setstate__
+        rebuilds the nodes with bulk_load.
+        """
+        keys, values = self.to_columns()
+        return {'order': self.order, 'version': self.version, 'keys': keys, 'values': values}
+
+    def to_columns(self) -> Tuple[List[Any], List[Any]]:
+        """All keys and their values as two parallel lists in key order (bulk_load's input, unzipped)."""
+        keys: List[Any] = []; values: List[Any] = []
+        leaf = self._leftmost_leaf()
+        while leaf is not None:
+            keys.extend(leaf.keys); values.extend(leaf.values)
+            leaf = leaf.next_leaf
+        return keys, values
+
+    @staticmethod
+    def auto_order(target_bytes: int = 64, item_size: int = 8) -> int:
+        """
+        Suggest an order whose key array fills `target_bytes`: 64 for one L1 cache
+        line, or e.g. 4096 for a page-sized node. A node's `keys` list stores one
+        8-byte pointer per key, so the defaults give order 9.
+        """
+        return max(3, target_bytes // item_size + 1)
+
+    def __setstate__(self, state: dict) -> None:
+        """
+        Restore a pickled tree. Column state (see __getstate__) is bulk loaded; older
+        saves pickled the node graph itself and get the attributes they lack filled
+        in (`version` starts at 0).
+        """
+        if 'root' not in state:
+            self.__init__(state['order'])
+            self.bulk_load(zip(state['keys'], state['values']))
+            self.version = state['version']
+            return
+        self.__dict__.update(state)
+        self.__dict__.setdefault('version', 0)
+        self.__dict__.setdefault('_max_keys', self.order - 1)
+        self.__dict__.setdefault('_free_nodes', [])
+        # Older versions could leave a keyless internal root above a single child
+        while not self.root.is_leaf and not self.root.keys and len(self.root.values) == 1:
+            self.root = self.root.values[0]
+        if '_rightmost_leaf' not in self.__dict__:
+            node = self.root
+            while not node.is_leaf: node = node.values[-1]
+            self._rightmost_leaf = node
+
+    def __deepcopy__(self, memo: dict) -> 'BPlusTree':
+        """
+        Copy the node graph level by level so the copy keeps this tree's exact shape
+        (the default deepcopy would go through __getstate__ and bulk load a packed
+        tree). Key lists are copied shallowly; leaf values are deep-copied.
+        """
+        clone = self.__class__(self.order)
+        memo[id(self)] = clone
+        clone.version = self.version
+        clone.root = BPlusTreeNode(self.order, self.root.is_leaf)
+        level = [(self.root, clone.root)]
+        while not level[0][0].is_leaf:
+            next_level = []
+            for src, dst in level:
+                dst.keys = src.keys.copy()
+                dst.values = [BPlusTreeNode(self.order, child.is_leaf) for child in src.values]
+                next_level.extend(zip(src.values, dst.values))
+            level = next_level
+        prev_leaf = None
+        for src, dst in level: # All leaves, left to right
+            dst.keys = src.keys.copy()
+            dst.values = deepcopy(src.values, memo)
+            if prev_leaf is not None: prev_leaf.next_leaf = dst
+            prev_leaf = dst
+        clone._rightmost_leaf = prev_leaf
+        return clone
 
     # --- Core Traversal ---
     def _find_leaf(self, key: Any) -> BPlusTreeNode:
         """Find the leaf node where the key should exist using bisect_right."""
         node = self.root
+        bisect_right = _bisect_right # Local lookup inside the per-level loop
         while not node.is_leaf:
-            assert len(node.values) == len(node.keys) + 1, f"Inv Vio: N {node} K {len(node.keys)} V {len(node.values)}"
-            idx = bisect.bisect_right(node.keys, key)
-            assert idx < len(node.values), f"Idx Err: idx={idx}, len(V)={len(node.values)} N {node}"
-            next_node = node.values[idx]
-            assert next_node.parent is node, f"Parent Err: C {next_node} P {next_node.parent}, Exp {node}"
-            node = next_node # type: ignore
+            node = node.values[bisect_right(node.keys, key)] # type: ignore
         return node
 
+    def _find_leaf_path(self, key: Any) -> Tuple[BPlusTreeNode, Path]:
+        """Like _find_leaf, also returning the (ancestor, child index) path for splits and rebalancing."""
+        node, path = self.root, []
+        while not node.is_leaf:
+            idx = _bisect_right(node.keys, key)
+            path.append((node, idx))
+            node = node.values[idx] # type: ignore
+        return node, path
+
+    def _rightmost_path(self) -> Path:
+        """The descent path to the right-most leaf."""
+        node, path = self.root, []
+        while not node.is_leaf:
+            idx = len(node.values) - 1
+            path.append((node, idx))
+            node = node.values[idx] # type: ignore
+        return path
+
+    def _check_invariants(self) -> None:
+        """
+        Walk the whole tree and raise AssertionError on the first broken invariant:
+        key order and separator bounds, node fill, child counts, equal leaf
+        depth, and the leaf chain (including _rightmost_leaf). Debugging aid only.
+        """
+        leaves: List[Tuple[BPlusTreeNode, int]] = []
+        stack: List[Tuple[BPlusTreeNode, Any, Any, int]] = [(self.root, None, None, 0)] # (node, low, high, depth)
+        while stack:
+            node, low, high, depth = stack.pop()
+            keys = node.keys
+            assert all(a < b for a, b in zip(keys, keys[1:])), f"Unsorted keys in {node}"
+            assert len(keys) <= self._max_keys, f"Overfull {node}"
+            if node is not self.root: assert len(keys) >= self._min_keys, f"Underfull {node}"
+            assert low is None or not keys or keys[0] >= low, f"{node} below separator {low}"
+            assert high is None or not keys or keys[-1] < high, f"{node} not below separator {high}"
+            if node.is_leaf:
+                assert len(node.values) == len(keys), f"Leaf {node} has {len(node.values)} values"
+                leaves.append((node, depth)); continue
+            assert len(node.values) == len(keys) + 1, f"Inv Vio: N {node} K {len(keys)} V {len(node.values)}"
+            bounds = [low] + keys + [high]
+            for i in range(len(node.values) - 1, -1, -1): # Reversed so leaves pop in key order
+                stack.append((node.values[i], bounds[i], bounds[i + 1], depth + 1))
+        assert len({depth for _, depth in leaves}) == 1, "Leaves at different depths"
+        for (leaf, _), (next_leaf, _) in zip(leaves, leaves[1:]):
+            assert leaf.next_leaf is next_leaf, f"Broken leaf chain after {leaf}"
+        assert leaves[-1][0].next_leaf is None and leaves[-1][0] is self._rightmost_leaf, "Bad right-most leaf"
+
+    def _new_node(self, is_leaf: bool) -> BPlusTreeNode:
+        """A node from the free pool if one is available, otherwise a fresh one."""
+        if self._free_nodes:
+            node = self._free_nodes.pop()
+            node.is_leaf = is_leaf
+            return node
+        return BPlusTreeNode(self.order, is_leaf=is_leaf)
+
+    def _release_node(self, node: BPlusTreeNode) -> None:
+        """Detach a node that left the tree and keep it for reuse (up to _NODE_POOL_LIMIT)."""
+        node.keys.clear(); node.values.clear(); node.next_leaf = None
+        if len(self._free_nodes) < _NODE_POOL_LIMIT: self._free_nodes.append(node)
+
     # --- Public Operations ---
 
+    def is_empty(self) -> bool:
+        """True if the tree holds no keys."""
+        return self.root.is_leaf and not self.root.keys
+
     def search(self, key: Any) -> Optional[Any]:
         """Search using bisect_left for efficiency."""
-        leaf = self._find_leaf(key)
+        leaf = self._find_leaf(key); keys = leaf.keys
         # Find insertion point for key
-        idx = bisect.bisect_left(leaf.keys, key)
+        idx = _bisect_left(keys, key)
         # Check if key at that index actually matches
-        if idx < len(leaf.keys) and leaf.keys[idx] == key:
+        if idx < len(keys) and keys[idx] == key:
             return leaf.values[idx]
         return None
 
+    def search_many(self, keys: List[Any]) -> List[Optional[Any]]:
+        """
+        Look up many keys at once; returns the values (None when absent) in input order.
+        Keys are visited in sorted order and each leaf is reused for every key that
+        falls inside its separator bounds, so clustered batches skip most descents.
+        Within a leaf each bisect starts at the previous key's position (lo hint).
+        """
+        results: List[Optional[Any]] = [None] * len(keys)
+        leaf: Optional[BPlusTreeNode] = None
+        upper: Any = None
+        idx = 0
+        for pos in sorted(range(len(keys)), key=keys.__getitem__):
+            key = keys[pos]
+            if leaf is None or (upper is not None and key >= upper):
+                leaf, upper, _ = self._find_leaf_bounded(key); idx = 0
+            idx = _bisect_left(leaf.keys, key, idx)
+            if idx < len(leaf.keys) and leaf.keys[idx] == key:
+                results[pos] = leaf.values[idx]
+        return results
+
     def insert(self, key: Any, value: Any) -> None:
-        """Insert a key-value pair into the tree."""
-        leaf = self._find_leaf(key)
-        insert_idx = bisect.bisect_left(leaf.keys, key)
-        # Optional: Check for duplicates before inserting
-        # if insert_idx < len(leaf.keys) and leaf.keys[insert_idx] == key:
-        #     # Handle duplicate (e.g., raise error or update)
-        #     # self.update(key, value) # Example update
-        #     # return
-        #     pass # Current behavior ignores duplicates silently if check omitted
+        """Insert a key-value pair into the tree (duplicates are not checked; see insert_if_absent)."""
+        leaf = self._rightmost_leaf
+        path: Optional[Path] = None
+        if leaf.keys and key > leaf.keys[-1]:
+            # Larger than every key in the tree (ascending ingest): append without descending
+            insert_idx = len(leaf.keys)
+        else:
+            leaf, path = self._find_leaf_path(key)
+            insert_idx = _bisect_left(leaf.keys, key)
+        self._insert_at(leaf, path, insert_idx, key, value)
+
+    def insert_if_absent(self, key: Any, value: Any) -> bool:
+        """
+        Insert a key-value pair unless the key is already present, with one descent
+        for both the duplicate check and the insert.
+
+        Returns:
+            bool: True if inserted, False if the key already existed (tree unchanged).
+        """
+        leaf = self._rightmost_leaf
+        path: Optional[Path] = None
+        if leaf.keys and key > leaf.keys[-1]:
+            insert_idx = len(leaf.keys) # Append fast path, as in insert(); cannot be a duplicate
+        else:
+            leaf, path = self._find_leaf_path(key)
+            insert_idx = _bisect_left(leaf.keys, key)
+            if insert_idx < len(leaf.keys) and leaf.keys[insert_idx] == key: return False
+        self._insert_at(leaf, path, insert_idx, key, value)
+        return True
+
+    def _insert_at(self, leaf: BPlusTreeNode, path: Optional[Path], insert_idx: int, key: Any, value: Any) -> None:
+        """Put key/value at insert_idx of leaf and split on overflow; path is None when insert took the append fast path."""
         leaf.keys.insert(insert_idx, key)
         leaf.values.insert(insert_idx, value)
-        if len(leaf.keys) == self.order: # Overflow check
-            self._split_node(leaf)
+        self.version += 1
+        if len(leaf.keys) > self._max_keys: # Overflow check
+            if path is None: path = self._rightmost_path() # Fast path skipped the descent; only splits need it
+            # Appending to the last leaf (sorted ingest): split off a minimal right node instead of halving
+            self._split_node(leaf, path, tail=leaf is self._rightmost_leaf and insert_idx == self._max_keys)
+        if _DEBUG: self._check_invariants()
+
+    def insert_many(self, pairs: List[Tuple[Any, Any]], presorted: bool = False) -> None:
+        """
+        Insert many (key, value) pairs; keys must be unique within the batch.
+        An empty tree is built with bulk_load. Otherwise the pairs are inserted
+        in key order, staying in the current leaf while keys remain below the
+        separator that bounds it, so runs of nearby keys skip the root descent;
+        the leaf bisect starts just past the previous insert (lo hint).
+        presorted=True skips the sort and the uniqueness check for callers that
+        already hold the pairs in strictly increasing key order.
+        """
+        if not presorted:
+            pairs = sorted(pairs, key=itemgetter(0))
+            if any(a[0] == b[0] for a, b in zip(pairs, pairs[1:])): raise BPlusTreeError("insert_many requires unique keys")
+        if not pairs: return
+        if self.is_empty():
+            self.bulk_load(pairs); return
+        leaf: Optional[BPlusTreeNode] = None
+        upper: Any = None # Smallest separator to the right of `leaf` (None: no bound)
+        path: Path = []
+        max_keys = self._max_keys
+        lo = 0 # Keys arrive ascending, so the next one lands after the last insert in this leaf
+        for key, value in pairs:
+            if leaf is None or (upper is not None and key >= upper):
+                leaf, upper, path = self._find_leaf_bounded(key); lo = 0
+            keys = leaf.keys
+            insert_idx = _bisect_left(keys, key, lo); lo = insert_idx + 1
+            keys.insert(insert_idx, key); leaf.values.insert(insert_idx, value)
+            if len(keys) > max_keys:
+                self._split_node(leaf, path, tail=leaf is self._rightmost_leaf and insert_idx == max_keys)
+                leaf = None # Key ranges changed; descend again for the next key
+        self.version += 1
+        if _DEBUG: self._check_invariants()
+
+    def _find_leaf_bounded(self, key: Any) -> Tuple[BPlusTreeNode, Any, Path]:
+        """Like _find_leaf_path, also returning the tightest separator above the leaf's key range (or None)."""
+        node, upper, path = self.root, None, []
+        while not node.is_leaf:
+            idx = _bisect_right(node.keys, key)
+            if idx < len(node.keys): upper = node.keys[idx]
+            path.append((node, idx))
+            node = node.values[idx] # type: ignore
+        return node, upper, path
 
     def delete(self, key: Any) -> bool:
         """Delete using bisect_left for lookup."""
-        leaf = self._find_leaf(key)
+        leaf, path = self._find_leaf_path(key); keys = leaf.keys
         # Find potential index using bisect_left
-        idx = bisect.bisect_left(leaf.keys, key)
+        idx = _bisect_left(keys, key)
         # Verify key exists at that index
-        if idx < len(leaf.keys) and leaf.keys[idx] == key:
-            leaf.keys.pop(idx)
-            leaf.values.pop(idx)
-            if leaf.is_underflow(self._min_keys):
-                self._handle_underflow(leaf)
+        if idx < len(keys) and keys[idx] == key:
+            del keys[idx]; del leaf.values[idx]
+            self.version += 1
+            if len(keys) < self._min_keys and path: # The root may hold any number of keys
+                self._handle_underflow(leaf, path)
+            if _DEBUG: self._check_invariants()
             return True # SUCCESS
         else:
             return False # FAILURE: Key not found
 
     def update(self, key: Any, new_value: Any) -> bool:
         """Update using bisect_left for lookup."""
-        leaf = self._find_leaf(key)
-        idx = bisect.bisect_left(leaf.keys, key)
-        if idx < len(leaf.keys) and leaf.keys[idx] == key:
+        leaf = self._find_leaf(key); keys = leaf.keys
+        idx = _bisect_left(keys, key)
+        if idx < len(keys) and keys[idx] == key:
             leaf.values[idx] = new_value
+            self.version += 1
             return True
         return False # Key not found
 
+    def delete_many(self, keys: List[Any]) -> int:
+        """
+        Delete many keys; returns how many were present. Keys are visited in
+        sorted order with the same leaf cursor as insert_many. Deleting from a
+        leaf leaves the separators above it valid, so the cursor (and its
+        descent path) is only dropped after a rebalance changes the structure.
+        """
+        leaf: Optional[BPlusTreeNode] = None
+        upper: Any = None
+        path: Path = []
+        min_keys = self._min_keys
+        idx = deleted = 0
+        for key in sorted(keys):
+            if leaf is None or (upper is not None and key >= upper):
+                leaf, upper, path = self._find_leaf_bounded(key); idx = 0
+            leaf_keys = leaf.keys
+            idx = _bisect_left(leaf_keys, key, idx)
+            if idx < len(leaf_keys) and leaf_keys[idx] == key:
+                del leaf_keys[idx]; del leaf.values[idx]
+                deleted += 1
+                if len(leaf_keys) < min_keys and path:
+                    self._handle_underflow(leaf, path) # Consumes path
+                    leaf = None
+        if deleted: self.version += 1
+        if _DEBUG: self._check_invariants()
+        return deleted
+
+    def update_many(self, pairs: List[Tuple[Any, Any]]) -> int:
+        """
+        Replace the values of many keys; returns how many keys were found.
+        Absent keys are skipped (nothing is inserted). Pairs are visited in key
+        order with the insert_many leaf cursor; for a key given twice the last
+        value wins, as with repeated update calls.
+        """
+        leaf: Optional[BPlusTreeNode] = None
+        upper: Any = None
+        idx = updated = 0
+        for key, value in sorted(pairs, key=itemgetter(0)):
+            if leaf is None or (upper is not None and key >= upper):
+                leaf, upper, _ = self._find_leaf_bounded(key); idx = 0
+            idx = _bisect_left(leaf.keys, key, idx)
+            if idx < len(leaf.keys) and leaf.keys[idx] == key:
+                leaf.values[idx] = value
+                updated += 1
+        if updated: self.version += 1
+        return updated
+
+    def bulk_load(self, sorted_pairs: List[Tuple[Any, Any]], fill: float = 1.0) -> None:
+        """
+        Build the tree bottom-up from (key, value) pairs with unique keys.
+        The tree must be empty. Leaves are filled, linked, then each internal
+        level is built from the one below - no _find_leaf calls and no splits.
+        Pairs are sorted first if they are not already in key order.
+
+        `fill` is the target leaf occupancy as a fraction of order - 1. Leaving
+        room (e.g. 0.75) means later inserts split less often. It is clamped so
+        that every leaf still meets the minimum key count.
+        """
+        if not self.is_empty(): raise BPlusTreeError("bulk_load requires an empty tree")
+        pairs = list(sorted_pairs)
+        if not pairs: return
+        keys = [k for k, _ in pairs]
+        if any(a >= b for a, b in zip(keys, keys[1:])):
+            pairs.sort(key=itemgetter(0)); keys = [k for k, _ in pairs]
+            if any(a == b for a, b in zip(keys, keys[1:])): raise BPlusTreeError("bulk_load requires unique keys")
+        # At least 2*min_keys per leaf so an even spread never drops a leaf below the minimum
+        leaf_capacity = min(self._max_keys, max(1, 2 * self._min_keys, int(self._max_keys * fill)))
+        # Level 0: leaves, entries spread evenly so every leaf meets the minimum fill
+        level: List[Tuple[BPlusTreeNode, Any]] = [] # (node, smallest key in its subtree)
+        prev_leaf: Optional[BPlusTreeNode] = None
+        for start, end in self._even_chunks(len(pairs), leaf_capacity):
+            leaf = BPlusTreeNode(self.order, is_leaf=True)
+            leaf.keys = keys[start:end]; leaf.values = [v for _, v in pairs[start:end]]
+            if prev_leaf is not None: prev_leaf.next_leaf = leaf
+            prev_leaf = leaf; level.append((leaf, leaf.keys[0]))
+        # Upper levels: group up to `order` children per parent until one root remains
+        while len(level) > 1:
+            parents: List[Tuple[BPlusTreeNode, Any]] = []
+            for start, end in self._even_chunks(len(level), self.order):
+                group = level[start:end]; node = BPlusTreeNode(self.order, is_leaf=False)
+                node.values = [child for child, _ in group]; node.keys = [min_key for _, min_key in group[1:]]
+                parents.append((node, group[0][1]))
+            level = parents
+        self.root = level[0][0]; self._rightmost_leaf = prev_leaf
+        self.version += 1
+
+    @classmethod
+    def from_pairs(cls, pairs: List[Tuple[Any, Any]], order: int = 4, fill: float = 1.0) -> 'BPlusTree':
+        """Create a tree of the given order and bulk_load it with (key, value) pairs."""
+        tree = cls(order=order)
+        tree.bulk_load(pairs, fill=fill)
+        return tree
+
+    @staticmethod
+    def _even_chunks(n: int, capacity: int) -> List[Tuple[int, int]]:
+        """Split range(n) into the fewest runs of at most `capacity`, sizes differing by at most one."""
+        count = -(-n // capacity) # ceil division
+        base, extra = divmod(n, count)
+        bounds, start = [], 0
+        for i in range(count):
+            end = start + base + (1 if i < extra else 0)
+            bounds.append((start, end)); start = end
+        return bounds
+
     # --- Range Query & Get All (Remain the same - already efficient) ---
-    def range_query(self, start_key: Any, end_key: Any) -> List[Tuple[Any, Any]]:
-        result: List[Tuple[Any, Any]] = []
-        leaf = self._find_leaf(start_key)
+    def range_query(self, start_key: Any, end_key: Any) -> Iterator[Tuple[Any, Any]]:
+        """
+        Yields (key, value) pairs with start_key <= key <= end_key in key order,
+        bisecting each leaf for its slice. Use list(...) when a list is needed.
+        The tree must not be modified while the generator is being consumed.
+        """
+        leaf: Optional[BPlusTreeNode] = self._find_leaf(start_key)
+        lo = _bisect_left(leaf.keys, start_key)
         while leaf is not None:
-            for i, k in enumerate(leaf.keys):
-                if k >= start_key:
-                    if k <= end_key: result.append((k, leaf.values[i]))
-                    else: return result
-            if not leaf.keys or leaf.keys[-1] >= end_key: break
-            leaf = leaf.next_leaf
-        return result
+            keys = leaf.keys
+            hi = _bisect_right(keys, end_key)
+            yield from zip(keys[lo:hi], leaf.values[lo:hi])
+            if hi < len(keys): return # end_key falls inside this leaf
+            leaf = leaf.next_leaf; lo = 0
+
+    def get_all(self) -> Iterator[Tuple[Any, Any]]:
+        """Yields every (key, value) pair in key order, one leaf at a time (see range_query)."""
+        current_leaf = self._leftmost_leaf()
+        while current_leaf is not None:
+            yield from zip(current_leaf.keys, current_leaf.values)
+            current_leaf = current_leaf.next_leaf
 
-    def get_all(self) -> List[Tuple[Any, Any]]:
-        result: List[Tuple[Any, Any]] = []
-        node = self.root
-        while not node.is_leaf:
-             if not node.values: return []
-             node = node.values[0] # type: ignore
-        current_leaf: Optional[BPlusTreeNode] = node
+    def iter_values(self) -> Iterator[Any]:
+        """Yields every value in key order, without building (key, value) tuples (see get_all)."""
+        current_leaf = self._leftmost_leaf()
         while current_leaf is not None:
-            for i, k in enumerate(current_leaf.keys): result.append((k, current_leaf.values[i]))
+            yield from current_leaf.values
             current_leaf = current_leaf.next_leaf
+
+    def iter_range_values(self, start_key: Any, end_key: Any) -> Iterator[Any]:
+        """Yields the values of keys in [start_key, end_key] in key order, without the keys (see range_query)."""
+        leaf: Optional[BPlusTreeNode] = self._find_leaf(start_key)
+        lo = _bisect_left(leaf.keys, start_key)
+        while leaf is not None:
+            keys = leaf.keys
+            hi = _bisect_right(keys, end_key)
+            yield from leaf.values[lo:hi]
+            if hi < len(keys): return # end_key falls inside this leaf
+            leaf = leaf.next_leaf; lo = 0
+
+    def range_values(self, start_key: Any, end_key: Any) -> List[Any]:
+        """List form of iter_range_values: one list.extend per leaf instead of a yield per value."""
+        result: List[Any] = []
+        leaf: Optional[BPlusTreeNode] = self._find_leaf(start_key)
+        lo = _bisect_left(leaf.keys, start_key)
+        while leaf is not None:
+            keys = leaf.keys
+            hi = _bisect_right(keys, end_key)
+            result.extend(leaf.values[lo:hi])
+            if hi < len(keys): break # end_key falls inside this leaf
+            leaf = leaf.next_leaf; lo = 0
         return result
 
-    def _split_node(self, node: BPlusTreeNode) -> None:
-        mid_idx = self.order // 2; new_sibling = BPlusTreeNode(self.order, parent=node.parent, is_leaf=node.is_leaf)
-        if node.is_leaf:
-            key_to_parent = node.keys[mid_idx]; new_sibling.keys = node.keys[mid_idx:]; new_sibling.values = node.values[mid_idx:]
-            node.keys = node.keys[:mid_idx]; node.values = node.values[:mid_idx]
-            new_sibling.next_leaf = node.next_leaf; node.next_leaf = new_sibling
-        else:
-            key_to_parent = node.keys[mid_idx]; new_sibling.keys = node.keys[mid_idx + 1:]; new_sibling.values = node.values[mid_idx + 1:]
-            node.keys = node.keys[:mid_idx]; node.values = node.values[:mid_idx + 1]
-            for child in new_sibling.values: child.parent = new_sibling # type: ignore
-            assert len(node.values) == len(node.keys) + 1, "Inv fail split orig"; assert len(new_sibling.values) == len(new_sibling.keys) + 1, "Inv fail split sib"
-        self._insert_in_parent(node, key_to_parent, new_sibling)
-
-    def _insert_in_parent(self, left_child: BPlusTreeNode, key: Any, right_child: BPlusTreeNode) -> None:
-        parent = left_child.parent
-        if parent is None:
-            new_root = BPlusTreeNode(self.order, is_leaf=False); new_root.keys = [key]; new_root.values = [left_child, right_child]
-            left_child.parent = new_root; right_child.parent = new_root; self.root = new_root; return
-        insert_idx = bisect.bisect_left(parent.keys, key); parent.keys.insert(insert_idx, key); parent.values.insert(insert_idx + 1, right_child); right_child.parent = parent
-        assert len(parent.values) == len(parent.keys) + 1, "Inv fail insert parent"
-        if len(parent.keys) == self.order: self._split_node(parent)
-
-    def _handle_underflow(self, node: BPlusTreeNode) -> None:
-        if node.parent is None:
-            if not node.is_leaf and not node.keys and len(node.values) == 1: self.root = node.values[0]; self.root.parent = None # type: ignore
-            return
-        parent = node.parent
-        try: child_index = parent.values.index(node)
-        except ValueError: raise RuntimeError(f"Consistency Err: N {node} not in P {parent}")
-        if child_index > 0: # Try borrow left
-            left_sibling = parent.values[child_index - 1]
-            if left_sibling.has_excess_keys(self._min_keys): self._borrow_from_left(node, left_sibling, parent, child_index); return
-        if child_index < len(parent.values) - 1: # Try borrow right
-            right_sibling = parent.values[child_index + 1]
-            if right_sibling.has_excess_keys(self._min_keys): self._borrow_from_right(node, right_sibling, parent, child_index); return
-        if child_index > 0: # Merge left
-            self._merge_nodes(parent.values[child_index - 1], node, parent, child_index - 1)
-        elif child_index < len(parent.values) - 1: # Merge right
-             self._merge_nodes(node, parent.values[child_index + 1], parent, child_index)
-        else: raise RuntimeError(f"Unexpected state in handle_underflow N {node}")
+    def _leftmost_leaf(self) -> Optional[BPlusTreeNode]:
+        node = self.root
+        while not node.is_leaf:
+            if not node.values: return None
+            node = node.values[0] # type: ignore
+        return node
+
+    def count(self) -> int:
+        """Number of keys in the tree, summed leaf by leaf."""
+        total, leaf = 0, self._leftmost_leaf()
+        while leaf is not None:
+            total += len(leaf.keys); leaf = leaf.next_leaf
+        return total
 
+    def get_page(self, offset: int, limit: int) -> List[Tuple[Any, Any]]:
+        """
+        Returns up to `limit` (key, value) pairs starting at position `offset` in key order.
+        Whole leaves before the offset are skipped by length, so only the requested slice is copied.
+        """
+        if offset < 0 or limit <= 0: return []
+        leaf = self._leftmost_leaf()
+        while leaf is not None and offset >= len(leaf.keys):
+            offset -= len(leaf.keys); leaf = leaf.next_leaf
+        result: List[Tuple[Any, Any]] = []
+        while leaf is not None and len(result) < limit:
+            end = offset + limit - len(result)
+            result.extend(zip(leaf.keys[offset:end], leaf.values[offset:end]))
+            offset = 0; leaf = leaf.next_leaf
+        return result
+
+    def _split_node(self, node: BPlusTreeNode, path: Path, tail: bool = False) -> None:
+        """
+        Split an overflowing node and push the middle key up into the last
+        ancestor on `path`, repeating up the path while ancestors overflow (the
+        path is consumed as the split propagates). A `tail` split (the
+        overflow came from appending at the right edge of the tree) keeps the left
+        node as full as possible and leaves the right node at the minimum size, so
+        ascending inserts do not leave a trail of half-empty nodes.
+        """
+        while node is not None:
+            is_leaf, keys, values = node.is_leaf, node.keys, node.values
+            if tail: mid_idx = self.order - self._min_keys if is_leaf else self.order - 1 - self._min_keys
+            else: mid_idx = self.order // 2
+            new_sibling = self._new_node(is_leaf)
+            key_to_parent = keys[mid_idx]
+            if is_leaf:
+                new_sibling.keys = keys[mid_idx:]; new_sibling.values = values[mid_idx:]
+                del keys[mid_idx:]; del values[mid_idx:] # Truncate in place, no new lists
+                new_sibling.next_leaf = node.next_leaf; node.next_leaf = new_sibling
+                if node is self._rightmost_leaf: self._rightmost_leaf = new_sibling
+            else:
+                new_sibling.keys = keys[mid_idx + 1:]; new_sibling.values = values[mid_idx + 1:]
+                del keys[mid_idx:]; del values[mid_idx + 1:]
+            node, tail = self._insert_in_parent(node, key_to_parent, new_sibling, path, tail)
+
+    def _insert_in_parent(self, left_child: BPlusTreeNode, key: Any, right_child: BPlusTreeNode, path: Path, tail: bool = False) -> Tuple[Optional[BPlusTreeNode], bool]:
+        """Add the separator and right half of a split to the parent; returns (parent, tail) if the parent now overflows, else (None, False)."""
+        if not path: # left_child was the root
+            new_root = self._new_node(is_leaf=False); new_root.keys.append(key); new_root.values.extend((left_child, right_child))
+            self.root = new_root; return None, False
+        parent, insert_idx = path.pop() # left_child sits at insert_idx, so the separator goes there too
+        parent.keys.insert(insert_idx, key); parent.values.insert(insert_idx + 1, right_child)
+        if len(parent.keys) > self._max_keys: return parent, tail and insert_idx == self._max_keys
+        return None, False
+
+    def _handle_underflow(self, node: BPlusTreeNode, path: Path) -> None:
+        """
+        Rebalance an underfull non-root node by borrowing from or merging with a
+        sibling. The last entry of `path` is its parent and its index there. A
+        merge can leave the parent underfull, so this repeats up the path (which
+        it consumes) until a level is balanced or the root is reached.
+        """
+        min_keys = self._min_keys
+        while True:
+            parent, child_index = path.pop()
+            siblings = parent.values
+            has_right = child_index < len(siblings) - 1
+            if child_index > 0: # Try borrow left
+                left_sibling = siblings[child_index - 1]
+                if len(left_sibling.keys) > min_keys: self._borrow_from_left(node, left_sibling, parent, child_index); return
+            if has_right: # Try borrow right
+                right_sibling = siblings[child_index + 1]
+                if len(right_sibling.keys) > min_keys: self._borrow_from_right(node, right_sibling, parent, child_index); return
+            if child_index > 0: # Merge left
+                self._merge_nodes(siblings[child_index - 1], node, parent, child_index - 1)
+            elif has_right: # Merge right
+                 self._merge_nodes(node, siblings[child_index + 1], parent, child_index)
+            else: raise RuntimeError(f"Unexpected state in handle_underflow N {node}")
+            if not path: # parent is the root
+                # Root lost its last separator: its only child becomes the new root
+                if not parent.keys: self.root = parent.values[0]; self._release_node(parent)
+                return
+            if len(parent.keys) >= min_keys: return
+            node = parent
+
+    # Borrowing moves half of the sibling's surplus in one batch of slice operations, so the
+    # two nodes end up evenly filled and the next deletes do not immediately borrow again.
     def _borrow_from_left(self, node: BPlusTreeNode, left_sibling: BPlusTreeNode, parent: BPlusTreeNode, node_idx: int) -> None:
         sep_idx = node_idx - 1
+        n = (len(left_sibling.keys) - len(node.keys)) // 2 # Entries (leaf) or children (internal) to move
         if node.is_leaf:
-            k = left_sibling.keys.pop(); v = left_sibling.values.pop(); node.keys.insert(0, k); node.values.insert(0, v)
+            node.keys[:0] = left_sibling.keys[-n:]; node.values[:0] = left_sibling.values[-n:]
+            del left_sibling.keys[-n:]; del left_sibling.values[-n:]
             parent.keys[sep_idx] = node.keys[0]
         else:
-            sep_k = parent.keys[sep_idx]; node.keys.insert(0, sep_k); parent.keys[sep_idx] = left_sibling.keys.pop()
-            child = left_sibling.values.pop(); node.values.insert(0, child); child.parent = node # type: ignore
+            # The separator rotates down in front of the moved keys; the left sibling's cut key goes up
+            cut = len(left_sibling.keys) - n
+            node.keys[:0] = left_sibling.keys[cut + 1:] + [parent.keys[sep_idx]]; parent.keys[sep_idx] = left_sibling.keys[cut]
+            node.values[:0] = left_sibling.values[-n:]
+            del left_sibling.keys[cut:]; del left_sibling.values[-n:]
 
     def _borrow_from_right(self, node: BPlusTreeNode, right_sibling: BPlusTreeNode, parent: BPlusTreeNode, node_idx: int) -> None:
         sep_idx = node_idx
+        n = (len(right_sibling.keys) - len(node.keys)) // 2
         if node.is_leaf:
-            k = right_sibling.keys.pop(0); v = right_sibling.values.pop(0); node.keys.append(k); node.values.append(v)
-            parent.keys[sep_idx] = right_sibling.keys[0] if right_sibling.keys else k
+            node.keys.extend(right_sibling.keys[:n]); node.values.extend(right_sibling.values[:n])
+            del right_sibling.keys[:n]; del right_sibling.values[:n]
+            parent.keys[sep_idx] = right_sibling.keys[0]
         else:
-            sep_k = parent.keys[sep_idx]; node.keys.append(sep_k); parent.keys[sep_idx] = right_sibling.keys.pop(0)
-            child = right_sibling.values.pop(0); node.values.append(child); child.parent = node # type: ignore
+            node.keys.append(parent.keys[sep_idx]); node.keys.extend(right_sibling.keys[:n - 1]); parent.keys[sep_idx] = right_sibling.keys[n - 1]
+            node.values.extend(right_sibling.values[:n])
+            del right_sibling.keys[:n]; del right_sibling.values[:n]
 
     def _merge_nodes(self, left_node: BPlusTreeNode, right_node: BPlusTreeNode, parent: BPlusTreeNode, left_idx: int) -> None:
+        """Fold right_node and the separator between them into left_node; the caller rebalances the parent."""
         sep_k = parent.keys.pop(left_idx); parent.values.pop(left_idx + 1)
         if not left_node.is_leaf:
             left_node.keys.append(sep_k); left_node.keys.extend(right_node.keys)
-            moved_children = list(right_node.values); left_node.values.extend(moved_children)
-            for child in moved_children: child.parent = left_node # type: ignore
+            left_node.values.extend(right_node.values)
         else:
             left_node.keys.extend(right_node.keys); left_node.values.extend(right_node.values)
             left_node.next_leaf = right_node.next_leaf
-        assert len(left_node.values) == len(left_node.keys) + (0 if left_node.is_leaf else 1), "Inv fail merge"
-        if parent.is_underflow(self._min_keys): self._handle_underflow(parent)
+            if right_node is self._rightmost_leaf: self._rightmost_leaf = left_node
+        self._release_node(right_node)
 
-    # --- Visualization (Keep HTML version from previous step) ---
-    
-    # In class BPlusTree within bplustree.py
+    # --- Visualization (rendering lives in bplustree_viz.py) ---
 
     def visualize_tree(self):
-        """
-        Generates a Graphviz Digraph object for visualization.
-        Uses HTML-like labels with single-row internal nodes and detailed leaf nodes.
-        """
-        try:
-            from graphviz import Digraph
-        except ImportError:
-            print("Install graphviz library and executable for visualization.")
-            return None
-
-        # Use node_attr shape='plain' so HTML table defines the shape
-        dot = Digraph(comment='B+ Tree', node_attr={'shape': 'plain'})
-
-        if not self.root or (self.root.is_leaf and not self.root.keys):
-            dot.node('empty', 'Tree is empty'); return dot
-
-        node_queue = [(self.root, 'node_root')]
-        node_id_map = {self.root: 'node_root'}
-        id_counter = 0
-        processed_nodes = set()
-        all_leaf_render_info = []
-
-        while node_queue:
-            current_node, node_id = node_queue.pop(0)
-            if current_node in processed_nodes: continue
-            processed_nodes.add(current_node)
-
-            # --- HTML Label Generation ---
-            # Use border=1 for debugging, 0 for final look
-            html_label = '<<TABLE BORDER="0" CELLBORDER="1" CELLSPACING="0" CELLPADDING="4">'
-
-            # <<< CORRECTED Internal Node HTML (Single Row: P0 | K1 | P1 | K2 | P2 ...) >>>
-            if not current_node.is_leaf:
-                html_label += '<TR>'
-                html_label += f'<TD PORT="f0">P0</TD>' # First pointer port
-                for i, key in enumerate(current_node.keys):
-                    html_label += f'<TD>{key}</TD>' # Key cell
-                    html_label += f'<TD PORT="f{i+1}">P{i+1}</TD>' # Next pointer port
-                html_label += '</TR>'
-                html_label += '</TABLE>>'
-                dot.node(node_id, label=html_label) # Node uses the HTML label
-
-                # Add children & edges (Connect TO pointer ports f{i})
-                for i, child in enumerate(current_node.values):
-                    if child not in node_id_map:
-                         id_counter += 1; child_id = f"node_{id_counter}"; node_id_map[child] = child_id
-                    else: child_id = node_id_map[child]
-                    if child not in processed_nodes and child not in [n for n, id_str in node_queue]: node_queue.append((child, child_id))
-                    # Ensure edge targets the correct port name defined above
-                    dot.edge(f"{node_id}:f{i}", child_id)
-            # <<< END CORRECTED Internal Node HTML >>>
-
-            else: # Leaf Node (Detailed View from previous step)
-                if not current_node.keys:
-                    html_label += '<TR><TD BGCOLOR="lightblue">Empty Leaf</TD></TR>'
-                else:
-                    # Create one cell per Key-Value pair in the leaf
-                    label_content = '<TR>'
-                    for i, key in enumerate(current_node.keys):
-                        value = current_node.values[i]
-                        # Create a compact representation of the record
-                        record_repr = f"Key: {key}<BR/>"
-                        if isinstance(value, dict):
-                            count = 0; max_fields_to_show = 2
-                            for rec_key, rec_val in value.items():
-                                if rec_key == key: continue # Skip main key
-                                val_str = str(rec_val); val_str = (val_str[:8] + '...') if len(val_str) > 10 else val_str
-                                record_repr += f"{rec_key}: {val_str}<BR/>"
-                                count += 1
-                                if count >= max_fields_to_show: break
-                        else: record_repr += f"Value: {str(value)[:15]}"
-                        # Add cell for this key-record pair
-                        label_content += f'<TD PORT="kv{i}" BGCOLOR="lightblue" ALIGN="LEFT">{record_repr}</TD>'
-                    label_content += '</TR>'
-                    html_label += label_content
-                html_label += '</TABLE>>'
-                dot.node(node_id, label=html_label)
-                all_leaf_render_info.append((current_node, node_id))
-            # --- End Label Generation ---
-
-        # --- Draw Leaf Links ---
-        # (Leaf linking logic remains the same)
-        first_leaf = self.root
-        while first_leaf and not first_leaf.is_leaf:
-             if not first_leaf.values: break
-             first_leaf = first_leaf.values[0] # type: ignore
-        obj_to_id = {node_obj: node_str_id for node_obj, node_str_id in all_leaf_render_info}; visited_leaves = set(); current_leaf_obj = first_leaf
-        while current_leaf_obj and current_leaf_obj not in visited_leaves:
-            visited_leaves.add(current_leaf_obj); current_leaf_id = obj_to_id.get(current_leaf_obj); next_leaf_obj = current_leaf_obj.next_leaf; next_leaf_id = obj_to_id.get(next_leaf_obj)
-            if current_leaf_id and next_leaf_id: dot.edge(f"{current_leaf_id}", f"{next_leaf_id}", style='dashed', arrowhead='none', constraint='false')
-            current_leaf_obj = next_leaf_obj
-        # --- End Leaf Links ---
-
-        return dot
-    
\ No newline at end of file
+        """Graphviz Digraph of the tree (see bplustree_viz.visualize); None if graphviz is missing."""
+        from .bplustree_viz import visualize
+        return visualize(self)
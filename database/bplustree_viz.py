@@ -0,0 +1,87 @@
+# File: db_management_system/database/bplustree_viz.py
+# Graphviz rendering for BPlusTree, kept out of bplustree.py so the index module
+# stays small and graphviz is only imported when a tree is actually drawn.
+
+from collections import deque
+
+def _internal_label(node):
+    """Single-row HTML label for an internal node: P0 | K1 | P1 | K2 | P2 ..."""
+    parts = ['<<TABLE BORDER="0" CELLBORDER="1" CELLSPACING="0" CELLPADDING="4"><TR>', '<TD PORT="f0">P0</TD>']
+    for i, key in enumerate(node.keys):
+        parts.append(f'<TD>{key}</TD><TD PORT="f{i+1}">P{i+1}</TD>')
+    parts.append('</TR></TABLE>>')
+    return "".join(parts)
+
+def _leaf_label(node, max_fields_to_show=2):
+    """HTML label for a leaf: one cell per key with a compact preview of its record."""
+    parts = ['<<TABLE BORDER="0" CELLBORDER="1" CELLSPACING="0" CELLPADDING="4"><TR>']
+    if not node.keys:
+        parts.append('<TD BGCOLOR="lightblue">Empty Leaf</TD>')
+    for i, (key, value) in enumerate(zip(node.keys, node.values)):
+        parts.append(f'<TD PORT="kv{i}" BGCOLOR="lightblue" ALIGN="LEFT">Key: {key}<BR/>')
+        if isinstance(value, dict):
+            count = 0
+            for rec_key, rec_val in value.items():
+                if rec_key == key: continue # Skip main key
+                val_str = str(rec_val); val_str = (val_str[:8] + '...') if len(val_str) > 10 else val_str
+                parts.append(f"{rec_key}: {val_str}<BR/>")
+                count += 1
+                if count >= max_fields_to_show: break
+        else: parts.append(f"Value: {str(value)[:15]}")
+        parts.append('</TD>')
+    parts.append('</TR></TABLE>>')
+    return "".join(parts)
+
+def visualize(tree):
+    """
+    Generates a Graphviz Digraph object for visualization.
+    Uses HTML-like labels with single-row internal nodes and detailed leaf nodes.
+
+    Args:
+        tree (BPlusTree): The tree to draw.
+
+    Returns:
+        graphviz.Digraph: The graph, or None if the graphviz package is missing.
+    """
+    try:
+        from graphviz import Digraph
+    except ImportError:
+        print("Install graphviz library and executable for visualization.")
+        return None
+
+    # Use node_attr shape='plain' so HTML table defines the shape
+    dot = Digraph(comment='B+ Tree', node_attr={'shape': 'plain'})
+
+    root = tree.root
+    if not root or (root.is_leaf and not root.keys):
+        dot.node('empty', 'Tree is empty'); return dot
+
+    node_queue = deque([(root, 'node_root')])
+    node_id_map = {root: 'node_root'}
+    id_counter = 0
+    leaf_ids = {}
+
+    while node_queue:
+        current_node, node_id = node_queue.popleft()
+
+        if not current_node.is_leaf:
+            dot.node(node_id, label=_internal_label(current_node))
+            # Add children & edges (Connect TO pointer ports f{i})
+            for i, child in enumerate(current_node.values):
+                if child not in node_id_map: # First sighting: assign an id and queue it (node_id_map doubles as the queued set)
+                     id_counter += 1; child_id = f"node_{id_counter}"; node_id_map[child] = child_id
+                     node_queue.append((child, child_id))
+                else: child_id = node_id_map[child]
+                dot.edge(f"{node_id}:f{i}", child_id)
+        else:
+            dot.node(node_id, label=_leaf_label(current_node))
+            leaf_ids[current_node] = node_id
+
+    # --- Draw Leaf Links ---
+    visited_leaves = set(); current_leaf_obj = tree._leftmost_leaf()
+    while current_leaf_obj and current_leaf_obj not in visited_leaves:
+        visited_leaves.add(current_leaf_obj); current_leaf_id = leaf_ids.get(current_leaf_obj); next_leaf_obj = current_leaf_obj.next_leaf; next_leaf_id = leaf_ids.get(next_leaf_obj)
+        if current_leaf_id and next_leaf_id: dot.edge(f"{current_leaf_id}", f"{next_leaf_id}", style='dashed', arrowhead='none', constraint='false')
+        current_leaf_obj = next_leaf_obj
+
+    return dot
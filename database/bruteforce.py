@@ -4,37 +4,44 @@ import sys
 class BruteForceDB:
     """
     Simple list-based storage for key-value pairs.
-    Operations use linear search.
+    Operations use linear search. This is the unindexed baseline the B+ Tree is
+    benchmarked against, so lookups stay O(n); they scan a parallel key list
+    with list.index, which runs the comparison loop in C.
     """
     def __init__(self):
         self.data = [] # List of (key, value) tuples
+        self._keys = [] # self.data's keys, in the same order
+
+    def _find(self, key):
+        """Position of the first occurrence of key, or -1."""
+        try:
+            return self._keys.index(key)
+        except ValueError:
+            return -1
 
     def insert(self, key, value):
         """Appends key-value pair. Does not check duplicates or order."""
         self.data.append((key, value))
+        self._keys.append(key)
 
     def search(self, key):
         """Linear search for key, returns value or None."""
-        for k, v in self.data:
-            if k == key:
-                return v
-        return None
+        i = self._find(key)
+        return self.data[i][1] if i >= 0 else None
 
     def delete(self, key):
         """Removes the first occurrence of the key. Returns True if found, False otherwise."""
-        for i, (k, v) in enumerate(self.data):
-            if k == key:
-                del self.data[i]
-                return True
-        return False
+        i = self._find(key)
+        if i < 0: return False
+        del self.data[i]; del self._keys[i]
+        return True
 
     def update(self, key, new_value):
         """Updates the value for the first occurrence of key. Returns True/False."""
-        for i, (k, v) in enumerate(self.data):
-            if k == key:
-                self.data[i] = (k, new_value)
-                return True
-        return False
+        i = self._find(key)
+        if i < 0: return False
+        self.data[i] = (key, new_value)
+        return True
 
     def range_query(self, start_key, end_key):
         """Linear scan for keys within the range."""
@@ -46,4 +53,4 @@ class BruteForceDB:
 
     def get_memory_usage(self):
         """Basic memory estimate."""
-        return sys.getsizeof(self.data) + sum(sys.getsizeof(item) for item in self.data)
\ No newline at end of file
+        return sys.getsizeof(self.data) + sys.getsizeof(self._keys) + sum(sys.getsizeof(item) for item in self.data)
\ No newline at end of file
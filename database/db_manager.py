@@ -1,7 +1,82 @@
 # File: db_management_system/database/db_manager.py
 import pickle  # Import the pickle library
 import os      # Import os for path manipulation
+import struct  # Fixed-width header holding the table-of-contents length
+import json    # Table of contents at the head of the save file
 from .table import Table # Import the Table class
+from .bplustree import BPlusTree
+
+try:
+    import orjson # Optional: faster JSON encode/decode for the table of contents
+except ImportError:
+    orjson = None
+
+try:
+    import numpy as np # Optional: stores int/float key columns as raw machine values
+except ImportError:
+    np = None
+
+try:
+    import zstandard # Optional: compresses each table segment in the save file
+except ImportError:
+    zstandard = None
+
+PICKLE_PROTOCOL = 5           # Protocol 5 supports out-of-band buffers (PEP 574)
+SAVE_MAGIC = b"BPTDB\x00"     # Leading bytes of a container save file (pickles start with 0x80)
+SAVE_FORMAT = 2               # Version of the table-of-contents layout (2: columnar table segments)
+TOC_HEADER = struct.Struct("<Q")  # Byte length of the JSON table of contents
+
+# Column types written to the table of contents by name; a schema using any
+# other type is pickled into the table's segment instead
+SCHEMA_TYPES = {"int": int, "float": float, "str": str, "bool": bool}
+SCHEMA_TYPE_NAMES = {col_type: type_name for type_name, col_type in SCHEMA_TYPES.items()}
+# NumPy dtypes for key columns of these search-key types; other keys are pickled
+KEY_DTYPES = {int: "<i8", float: "<f8"}
+ZSTD_LEVEL = 3                # Compression level for table segments when zstandard is installed
+
+def _segment_size(info):
+    """Byte length of a table's segment as stored in the file, from its table-of-contents entry."""
+    if "stored_length" in info:
+        return info["stored_length"] # Compressed
+    return info["keys_length"] + info["length"] + sum(info["buffers"])
+
+class _SavedTable:
+    """
+    Placeholder for a table read from a save file but not unpickled yet.
+    DatabaseManager.get_table swaps it for the real Table on first access.
+    """
+    def __init__(self, info, segment):
+        self.info = info          # The table's entry from the save file's table of contents
+        self.segment = segment    # memoryview: the table's segment as stored (see DatabaseManager.save_to_disk)
+
+    def materialize(self, table_name):
+        """
+        Decodes the segment and bulk loads its columns into a new tree.
+
+        Args:
+            table_name (str): The table's name.
+
+        Returns:
+            Table: The restored table.
+        """
+        info, segment = self.info, self.segment
+        if info.get("compression") == "zstd": # Availability of zstandard is checked at load time
+            segment = memoryview(zstandard.ZstdDecompressor().decompress(segment))
+        keys_length = info["keys_length"]
+        start = keys_length + info["length"]
+        buffers = []
+        for length in info["buffers"]:
+            buffers.append(segment[start:start + length]); start += length
+        payload = pickle.loads(segment[keys_length:keys_length + info["length"]], buffers=buffers)
+        if info["schema"] is None: schema, payload = payload # Pickled along with the data
+        else: schema = {col_name: SCHEMA_TYPES[type_name] for col_name, type_name in info["schema"].items()}
+        keys_dtype = info["keys_dtype"]
+        if keys_dtype is None: keys, values = payload
+        else: keys, values = np.frombuffer(segment[:keys_length], dtype=keys_dtype).tolist(), payload
+        tree = BPlusTree(info["order"])
+        tree.bulk_load(zip(keys, values))
+        return Table.from_saved(table_name, schema, info["order"], info["search_key"], tree)
+
 
 class DatabaseManager:
     """
@@ -11,6 +86,7 @@ class DatabaseManager:
     def __init__(self):
         """Initializes the DatabaseManager with an empty dictionary to hold databases."""
         self.databases = {}  # Structure: {db_name: {table_name: Table_instance}}
+        self._table_cache = {}  # (db_name, table_name) -> Table; one-hash fast path for get_table
         print("Database Manager initialized.")
 
     def create_database(self, db_name):
@@ -45,7 +121,8 @@ class DatabaseManager:
         if db_name not in self.databases:
             return f"Database '{db_name}' not found.", False
 
-        del self.databases[db_name]
+        for table_name in self.databases.pop(db_name):
+            self._table_cache.pop((db_name, table_name), None)
         print(f"Database '{db_name}' deleted successfully.")
         return None, True
 
@@ -85,6 +162,7 @@ class DatabaseManager:
             # Create the Table instance (constructor handles schema/key validation)
             new_table = Table(name=table_name, schema=schema, order=order, search_key=search_key)
             self.databases[db_name][table_name] = new_table
+            self._table_cache[(db_name, table_name)] = new_table
             print(f"Table '{table_name}' created in database '{db_name}'.")
             return None, True
         except ValueError as ve: # Catch validation errors from Table constructor
@@ -109,6 +187,7 @@ class DatabaseManager:
             return f"Table '{table_name}' not found in database '{db_name}'.", False
 
         del self.databases[db_name][table_name]
+        self._table_cache.pop((db_name, table_name), None)
         print(f"Table '{table_name}' deleted from database '{db_name}'.")
         return None, True
 
@@ -138,8 +217,12 @@ class DatabaseManager:
             table_name (str): The name of the table.
 
         Returns:
-            tuple: (Table_instance, True) on success, (None, False) if db or table not found.
+            tuple: (Table_instance, True) on success, (None, False) if db or table not found
+                   or a lazily loaded table's saved data cannot be read.
         """
+        table_instance = self._table_cache.get((db_name, table_name))
+        if table_instance is not None:
+            return table_instance, True
         if db_name not in self.databases:
             # print(f"Error getting table: Database '{db_name}' not found.")
             return None, False
@@ -147,7 +230,16 @@ class DatabaseManager:
         if table_instance is None:
             # print(f"Error getting table: Table '{table_name}' not found in database '{db_name}'.")
             return None, False
-
+        if isinstance(table_instance, _SavedTable):
+            # First access since load_from_disk: unpickle just this table
+            try:
+                table_instance = table_instance.materialize(table_name)
+            except Exception as e:
+                print(f"Failed to load table '{table_name}' from database '{db_name}': {e}")
+                return None, False
+            self.databases[db_name][table_name] = table_instance
+
+        self._table_cache[(db_name, table_name)] = table_instance
         return table_instance, True
     
     # --- task 6 NEW Persistence Methods ---
@@ -155,10 +247,103 @@ class DatabaseManager:
     def save_to_disk(self, filepath):
         """
         Saves the entire state of the Database Manager (all databases and tables)
-        to a file using pickle.
+        to a single container file (see prepare_save for the layout).
+
+        Args:
+            filepath (str): The path to the file where the data should be saved.
+
+        Returns:
+            tuple: (None, True) on success, (error_message, False) on failure.
+        """
+        chunks, success = self.prepare_save(filepath)
+        if not success:
+            return chunks, False
+        return self.write_save(filepath, chunks)
+
+    def prepare_save(self, filepath):
+        """
+        Encodes the current state into the bytes of a save file, without writing
+        it. This reads every table, so it must run on the thread that modifies
+        them; the result is immutable and can be handed to write_save on another
+        thread. The file layout is:
+
+            SAVE_MAGIC | TOC length (uint64) | TOC (JSON) | table segments
+
+        The table of contents holds each table's schema, order, search key and
+        the position of its segment, relative to the start of the segments.
+        A schema with column types outside SCHEMA_TYPES is written as null and
+        pickled together with the values instead.
+        A segment stores the tree's contents as columns rather than its nodes:
+        the keys as raw int64/float64 values when the search key is an int or
+        float column (and NumPy is installed), then a pickle of the values (or
+        of the keys and values together), then any out-of-band buffers. When
+        zstandard is installed each segment is zstd-compressed on its own, so
+        tables can still be loaded (and copied on re-save) independently.
+
+        Args:
+            filepath (str): The destination, used in error messages.
+
+        Returns:
+            tuple: (list of bytes-like chunks, True) on success, (error_message, False) on failure.
+        """
+        try:
+            chunks, offset = [], 0
+            toc_databases = {}
+            compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL) if zstandard is not None else None
+            for db_name, tables in self.databases.items():
+                toc_tables = toc_databases[db_name] = {}
+                for table_name, table in tables.items():
+                    if isinstance(table, _SavedTable):
+                        # Never opened since the last load: copy its saved bytes as they are
+                        info = dict(table.info, offset=offset)
+                        toc_tables[table_name] = info
+                        chunks.append(table.segment)
+                        offset += table.segment.nbytes
+                        continue
+                    keys, values = table.data.to_columns()
+                    keys_column, keys_dtype = self._encode_keys(keys, table.schema[table.search_key])
+                    # Large bytes-like payloads (e.g. PickleBuffer-aware arrays) are handed
+                    # to buffer_callback and stored raw right after the pickle; they are
+                    # copied so later changes to the records cannot reach the snapshot.
+                    buffers = []
+                    data = values if keys_dtype else (keys, values)
+                    if all(col_type in SCHEMA_TYPE_NAMES for col_type in table.schema.values()):
+                        schema = {col_name: SCHEMA_TYPE_NAMES[col_type] for col_name, col_type in table.schema.items()}
+                    else:
+                        schema, data = None, (table.schema, data)
+                    payload = pickle.dumps(data, protocol=PICKLE_PROTOCOL, buffer_callback=buffers.append)
+                    views = [bytes(buf.raw()) for buf in buffers]
+                    info = toc_tables[table_name] = {
+                        "schema": schema,
+                        "order": table.order,
+                        "search_key": table.search_key,
+                        "keys_dtype": keys_dtype,
+                        "keys_length": len(keys_column),
+                        "offset": offset,
+                        "length": len(payload),
+                        "buffers": [len(v) for v in views],
+                    }
+                    segment = [keys_column, payload] + views
+                    if compressor is not None:
+                        segment = [compressor.compress(b"".join(segment))]
+                        info["compression"] = "zstd"; info["stored_length"] = len(segment[0])
+                    chunks.extend(segment)
+                    offset += _segment_size(info)
+            toc = self._encode_json({"format": SAVE_FORMAT, "databases": toc_databases})
+            return [SAVE_MAGIC, TOC_HEADER.pack(len(toc)), toc] + chunks, True
+        except (pickle.PicklingError, Exception) as e:
+            error_msg = f"Failed to save database state to '{filepath}': {e}"
+            print(error_msg)
+            return error_msg, False
+
+    def write_save(self, filepath, chunks):
+        """
+        Writes chunks from prepare_save to filepath. Touches no table, so it is
+        safe to run on a background thread while the tables keep changing.
 
         Args:
             filepath (str): The path to the file where the data should be saved.
+            chunks (list): The save file's contents, from prepare_save.
 
         Returns:
             tuple: (None, True) on success, (error_message, False) on failure.
@@ -169,21 +354,23 @@ class DatabaseManager:
             if dir_name: # Check if directory part exists in the path
                 os.makedirs(dir_name, exist_ok=True)
 
-            # Open the file in binary write mode ('wb')
-            with open(filepath, 'wb') as f:
-                # Dump the self.databases dictionary into the file
-                pickle.dump(self.databases, f, pickle.HIGHEST_PROTOCOL)
+            # Everything goes into one file, written via a temp file that is swapped in,
+            # so a crash mid-save never leaves a truncated or mismatched save
+            self._atomic_write(filepath, chunks)
             print(f"Database state successfully saved to '{filepath}'.")
             return None, True
-        except (pickle.PicklingError, OSError, IOError, Exception) as e:
+        except (OSError, IOError, Exception) as e:
             error_msg = f"Failed to save database state to '{filepath}': {e}"
             print(error_msg)
             return error_msg, False
 
     def load_from_disk(self, filepath):
         """
-        Loads the Database Manager state from a previously saved pickle file.
-        This will overwrite the current state in self.databases.
+        Loads the Database Manager state from a file written by save_to_disk.
+        Only the table of contents is decoded here; each table's tree is
+        unpickled the first time get_table asks for it. Older saves (a single
+        pickle of all databases) are still accepted. This will overwrite the
+        current state in self.databases.
 
         Args:
             filepath (str): The path to the file from which to load the data.
@@ -196,10 +383,17 @@ class DatabaseManager:
             if not os.path.exists(filepath):
                 return f"Load failed: File not found at '{filepath}'.", False
 
-            # Open the file in binary read mode ('rb')
+            # Read the whole file in one call and unpickle from memory; pickle.load on a
+            # file object issues many small read() calls through the file layer.
             with open(filepath, 'rb') as f:
-                # Load the data (should be the dictionary) from the file
-                loaded_data = pickle.load(f)
+                data = f.read()
+
+            if data.startswith(SAVE_MAGIC):
+                loaded_data = self._tables_from_container(memoryview(data))
+            else:
+                # Load the data (should be the dictionary) from the in-memory bytes
+                loaded_data = pickle.loads(data)
+            del data
 
             # Basic validation: Check if loaded data is a dictionary
             if not isinstance(loaded_data, dict):
@@ -207,6 +401,7 @@ class DatabaseManager:
 
             # Restore the state
             self.databases = loaded_data
+            self._table_cache = {} # Tables are cached again as get_table reaches them
             print(f"Database state successfully loaded from '{filepath}'.")
             # Optional: You might want to print loaded databases/tables here for confirmation
             # self.list_databases()
@@ -223,4 +418,92 @@ class DatabaseManager:
             print(error_msg)
             # Optionally reset state if load fails badly
             # self.databases = {}
-            return error_msg, False
\ No newline at end of file
+            return error_msg, False
+
+    @staticmethod
+    def _tables_from_container(view):
+        """
+        Builds {db_name: {table_name: _SavedTable}} from a container save file.
+
+        Args:
+            view (memoryview): Contents of the save file, starting with SAVE_MAGIC.
+
+        Returns:
+            dict: The databases, with every table still pickled.
+        """
+        toc_start = len(SAVE_MAGIC) + TOC_HEADER.size
+        (toc_length,) = TOC_HEADER.unpack_from(view, len(SAVE_MAGIC))
+        toc = DatabaseManager._decode_json(view[toc_start:toc_start + toc_length])
+        if toc.get("format") != SAVE_FORMAT:
+            raise TypeError(f"Unsupported save format {toc.get('format')!r}.")
+        segments = view[toc_start + toc_length:]
+        databases = {}
+        for db_name, toc_tables in toc["databases"].items():
+            tables = databases[db_name] = {}
+            for table_name, info in toc_tables.items():
+                end = info["offset"] + _segment_size(info)
+                if end > len(segments):
+                    raise EOFError(f"Save data for table '{table_name}' is truncated.")
+                if info.get("compression") == "zstd" and zstandard is None:
+                    raise ImportError(f"Table '{table_name}' was saved with zstd compression; install zstandard to load it.")
+                tables[table_name] = _SavedTable(info, segments[info["offset"]:end])
+        return databases
+
+    @staticmethod
+    def _encode_keys(keys, key_type):
+        """
+        Packs a key column as raw little-endian int64/float64 values.
+
+        Args:
+            keys (list): The tree's keys in order.
+            key_type (type): The search key's schema type.
+
+        Returns:
+            tuple: (bytes, dtype string), or (b"", None) when the keys must be
+            pickled instead (other or mixed types, ints beyond int64, or no NumPy).
+        """
+        dtype = KEY_DTYPES.get(key_type)
+        # Exact type check: bools pass as int and ints as float in validation, and must round-trip unchanged
+        if np is None or dtype is None or any(type(key) is not key_type for key in keys):
+            return b"", None
+        try:
+            column = np.array(keys, dtype=dtype)
+        except (OverflowError, TypeError, ValueError):
+            return b"", None
+        return column.tobytes(), dtype
+
+    @staticmethod
+    def _encode_json(obj):
+        """Serializes the table of contents to UTF-8 JSON bytes, using orjson when it is installed."""
+        if orjson is not None:
+            return orjson.dumps(obj)
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+    @staticmethod
+    def _decode_json(data):
+        """Parses table-of-contents JSON bytes, using orjson when it is installed."""
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(bytes(data))
+
+    @staticmethod
+    def _atomic_write(filepath, chunks):
+        """
+        Writes chunks to filepath via a temporary file that is fsync'ed and then
+        renamed over the target with os.replace (atomic on POSIX and Windows).
+
+        Args:
+            filepath (str): Final destination path.
+            chunks (list): bytes-like objects written in order.
+        """
+        tmp_path = filepath + ".tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno()) # One sync per file, after all chunks are written
+            os.replace(tmp_path, filepath)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -5,17 +5,29 @@ import random
 import sys
 import math
 import tracemalloc
+from array import array
+from collections import deque
 from copy import deepcopy
+from itertools import chain, starmap
+from operator import itemgetter
 
 from .bplustree import BPlusTree
 from .bruteforce import BruteForceDB
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 try:
     from pympler import asizeof
     use_pympler = True
 except ImportError:
     use_pympler = False
-    def asizeof(obj): return sys.getsizeof(obj) # Basic fallback
+
+def _drain(iterator):
+    """Runs an iterator to the end without keeping its results (a zero-length deque consumes it in C)."""
+    deque(iterator, maxlen=0)
 
 class PerformanceAnalyzer:
     """
@@ -24,46 +36,106 @@ class PerformanceAnalyzer:
     Focuses on Peak Insert Memory (tracemalloc) across orders.
     Times all core operations (Insert, Search, Range, Delete, Update, Mix) across orders.
     """
-    def __init__(self):
-        pass # Config passed to methods
+    def __init__(self, bulk_load_sorted=False):
+        """
+        Args:
+            bulk_load_sorted (bool): Build the timing tests' sorted-input tree with
+                BPlusTree.bulk_load (O(n), fully packed leaves) instead of inserting the
+                sorted keys one by one. Faster setup, but a different tree shape.
+        """
+        self.bulk_load_sorted = bulk_load_sorted
+        # (data_size, btree_order) -> populated (btree_unsorted, btree_sorted, bf_db, keys);
+        # holds the most recent configuration only
+        self._setup_cache = {}
 
     def _generate_random_data(self, size, max_key_value=None, sort_keys=False):
         if max_key_value is None: max_key_value = size * 3
         effective_size = min(size, max_key_value)
         if effective_size < size: print(f"Warn: Size {size}>Rng {max_key_value}. Gen {effective_size}.")
+        if np is not None:
+            # Sample in C; seeded from `random` so random.seed() still makes runs repeatable.
+            # choice() already returns the keys in random order, so no extra shuffle.
+            rng = np.random.default_rng(random.getrandbits(64))
+            key_array = rng.choice(max_key_value, size=effective_size, replace=False) + 1
+            if sort_keys: key_array.sort()
+            keys = key_array.tolist()
+            return [(key, f"value_{key*2}") for key in keys], keys
         keys = random.sample(range(1, max_key_value + 1), effective_size)
         if sort_keys: keys.sort()
         data_pairs = [(key, f"value_{key*2}") for key in keys] # Make values slightly different
         if not sort_keys: random.shuffle(data_pairs)
         return data_pairs, keys
 
-    def _trace_and_time_insertion(self, db_class, order, data_pairs):
-        """Inserts data, returns (insert_time, peak_memory_bytes)."""
-        if db_class == BPlusTree: instance = db_class(order=order)
-        else: instance = db_class()
-        tracemalloc.start(); t_start = time.perf_counter(); tracemalloc.reset_peak()
+    @staticmethod
+    def _new_instance(db_class, order):
+        return db_class(order=order) if db_class == BPlusTree else db_class()
+
+    def _time_insertion(self, db_class, order, data_pairs):
+        """Inserts data into a fresh instance with no tracing active, returns (insert_time, instance)."""
+        instance = self._new_instance(db_class, order)
+        t_start = time.perf_counter_ns()
         for key, value in data_pairs: instance.insert(key, value)
-        t_end = time.perf_counter(); _, peak = tracemalloc.get_traced_memory(); tracemalloc.stop()
-        insert_time = t_end - t_start
+        return (time.perf_counter_ns() - t_start) * 1e-9, instance
+
+    def _measure_insertion_memory(self, db_class, order, data_pairs):
+        """
+        Repeats the inserts on another fresh instance under tracemalloc, returns peak_memory_bytes.
+        Kept out of _time_insertion: tracemalloc hooks every allocation and would inflate the timing.
+        """
+        instance = self._new_instance(db_class, order)
+        tracemalloc.start(); tracemalloc.reset_peak()
+        for key, value in data_pairs: instance.insert(key, value)
+        _, peak = tracemalloc.get_traced_memory(); tracemalloc.stop()
+        del instance
+        return peak
+
+    def _insertion_stats(self, db_class, order, data_pairs):
+        """Returns (insert_time, peak_memory_bytes, final_size_bytes); without pympler the final size is sys.getsizeof (shallow)."""
+        insert_time, instance = self._time_insertion(db_class, order, data_pairs)
+        final_size = asizeof.asizeof(instance) if use_pympler else sys.getsizeof(instance) # Basic fallback
         del instance
-        return insert_time, peak
+        return insert_time, self._measure_insertion_memory(db_class, order, data_pairs), final_size
 
     def run_insertion_memory_time_test(self, data_size, btree_order):
-        """Tests ONLY peak memory and time for INSERTS."""
+        """Tests ONLY peak memory and time for INSERTS (timed and traced in separate passes)."""
         results = {}
         print(f"    Ins/Mem Test (Size:{data_size}, Order:{btree_order})...")
-        bf_data, _ = self._generate_random_data(data_size)
-        bf_time, bf_peak = self._trace_and_time_insertion(BruteForceDB, None, bf_data)
-        results['bf_insert_time'] = bf_time; results['bf_peak_mem'] = bf_peak; del bf_data
+        # One dataset for all three: BF and unsorted B+ insert it as generated, sorted B+ in key order
         uns_data, _ = self._generate_random_data(data_size, sort_keys=False)
-        uns_time, uns_peak = self._trace_and_time_insertion(BPlusTree, btree_order, uns_data)
-        results['bplus_insert_time_unsorted'] = uns_time; results['bplus_peak_mem_unsorted'] = uns_peak; del uns_data
-        sor_data, _ = self._generate_random_data(data_size, sort_keys=True)
-        sor_time, sor_peak = self._trace_and_time_insertion(BPlusTree, btree_order, sor_data)
-        results['bplus_insert_time_sorted'] = sor_time; results['bplus_peak_mem_sorted'] = sor_peak; del sor_data
+        sor_data = sorted(uns_data, key=itemgetter(0))
+        bf_time, bf_peak, bf_size = self._insertion_stats(BruteForceDB, None, uns_data)
+        results['bf_insert_time'] = bf_time; results['bf_peak_mem'] = bf_peak; results['bf_final_size'] = bf_size
+        uns_time, uns_peak, uns_size = self._insertion_stats(BPlusTree, btree_order, uns_data)
+        results['bplus_insert_time_unsorted'] = uns_time; results['bplus_peak_mem_unsorted'] = uns_peak; results['bplus_final_size_unsorted'] = uns_size
+        sor_time, sor_peak, sor_size = self._insertion_stats(BPlusTree, btree_order, sor_data)
+        results['bplus_insert_time_sorted'] = sor_time; results['bplus_peak_mem_sorted'] = sor_peak; results['bplus_final_size_sorted'] = sor_size
+        del uns_data, sor_data
         return results
 
-    def _setup_all_for_timing(self, data_size, btree_order):
+    def clear_setup_cache(self):
+        """Drops the cached timing-test instances (e.g. after the last run of a sweep)."""
+        self._setup_cache = {}
+
+    def _setup_all_for_timing(self, data_size, btree_order, mutable=True):
+         """
+         Returns the 3 populated instances (and their keys) for one timing test run.
+         They are cached until a test asks for a different (data_size, btree_order),
+         so consecutive tests on one configuration build them once; tests that
+         modify them pass mutable=True and get deep copies (same tree shapes), while
+         read-only tests share the cached instances.
+         """
+         cache_key = (data_size, btree_order)
+         cached = self._setup_cache.get(cache_key)
+         if cached is None:
+             self._setup_cache = {} # Release the previous configuration before building
+             cached = self._build_all_for_timing(data_size, btree_order)
+             self._setup_cache[cache_key] = cached
+         btree_unsorted, btree_sorted, bf_db, base_keys = cached
+         if mutable:
+             btree_unsorted, btree_sorted, bf_db = deepcopy(btree_unsorted), deepcopy(btree_sorted), deepcopy(bf_db)
+         return btree_unsorted, btree_sorted, bf_db, base_keys
+
+    def _build_all_for_timing(self, data_size, btree_order):
          """ Helper to create all 3 populated instances needed for one timing test run """
          # Generate base keys
          base_data, base_keys = self._generate_random_data(data_size, sort_keys=False)
@@ -77,9 +149,11 @@ class PerformanceAnalyzer:
          for k, v in base_data: btree_unsorted.insert(k, v)
 
          # B+ Sorted uses sorted data (built from same keys)
-         sorted_data = sorted(base_data, key=lambda item: item[0]) # Sort pairs by key
+         sorted_data = sorted(base_data, key=itemgetter(0)) # Sort pairs by key
          btree_sorted = BPlusTree(order=btree_order) # <<< Variable defined here
-         for k, v in sorted_data: btree_sorted.insert(k, v)
+         if self.bulk_load_sorted: btree_sorted.bulk_load(sorted_data)
+         else:
+             for k, v in sorted_data: btree_sorted.insert(k, v)
 
          return btree_unsorted, btree_sorted, bf_db, base_keys # CORRECT - Return defined variables
 
@@ -88,30 +162,39 @@ class PerformanceAnalyzer:
     def run_search_test(self, data_size, btree_order):
         """Tests search time."""
         print(f"    Search Test (Size:{data_size}, Order:{btree_order})...")
-        bplus_uns, bplus_sort, bf_db, keys_present = self._setup_all_for_timing(data_size, btree_order)
+        bplus_uns, bplus_sort, bf_db, keys_present = self._setup_all_for_timing(data_size, btree_order, mutable=False)
         if not keys_present: return {'bplus_search_time_unsorted': 0, 'bplus_search_time_sorted': 0, 'bf_search_time': 0}
         results = {}
         sample_size = min(len(keys_present), max(500, len(keys_present)//10)) # Smaller sample
         keys_to_search = random.sample(keys_present, k=sample_size)
-        t_start = time.perf_counter(); [bplus_uns.search(k) for k in keys_to_search]; results['bplus_search_time_unsorted'] = time.perf_counter() - t_start
-        t_start = time.perf_counter(); [bplus_sort.search(k) for k in keys_to_search]; results['bplus_search_time_sorted'] = time.perf_counter() - t_start
-        t_start = time.perf_counter(); [bf_db.search(k) for k in keys_to_search]; results['bf_search_time'] = time.perf_counter() - t_start
+        t_start = time.perf_counter_ns(); _drain(map(bplus_uns.search, keys_to_search)); results['bplus_search_time_unsorted'] = (time.perf_counter_ns() - t_start) * 1e-9
+        t_start = time.perf_counter_ns(); _drain(map(bplus_sort.search, keys_to_search)); results['bplus_search_time_sorted'] = (time.perf_counter_ns() - t_start) * 1e-9
+        t_start = time.perf_counter_ns(); _drain(map(bf_db.search, keys_to_search)); results['bf_search_time'] = (time.perf_counter_ns() - t_start) * 1e-9
+        # Same keys through the batch API (one descent per leaf rather than per key)
+        t_start = time.perf_counter_ns(); bplus_uns.search_many(keys_to_search); results['bplus_search_batch_time_unsorted'] = (time.perf_counter_ns() - t_start) * 1e-9
+        t_start = time.perf_counter_ns(); bplus_sort.search_many(keys_to_search); results['bplus_search_batch_time_sorted'] = (time.perf_counter_ns() - t_start) * 1e-9
         results['num_searches'] = sample_size
         del bplus_uns, bplus_sort, bf_db; return results
 
     def run_range_query_test(self, data_size, btree_order, num_queries=50): # Fewer queries
         """Tests range query time."""
         print(f"    Range Test (Size:{data_size}, Order:{btree_order})...")
-        bplus_uns, bplus_sort, bf_db, keys_present = self._setup_all_for_timing(data_size, btree_order)
+        bplus_uns, bplus_sort, bf_db, keys_present = self._setup_all_for_timing(data_size, btree_order, mutable=False)
         if not keys_present or len(keys_present) < 2: return {'bplus_range_time_unsorted': 0, 'bplus_range_time_sorted': 0, 'bf_range_time': 0}
         results = {}; min_k, max_k = min(keys_present), max(keys_present); span = max_k - min_k
         if span <= 0: return {'bplus_range_time_unsorted': 0, 'bplus_range_time_sorted': 0, 'bf_range_time': 0}
-        queries = []
-        for _ in range(num_queries):
-             r_size = random.randint(1, max(2, span // 20)); s_k = random.randint(min_k, max(min_k, max_k - r_size)); e_k = s_k + r_size; queries.append((s_k, e_k))
-        t_start = time.perf_counter(); [bplus_uns.range_query(s, e) for s,e in queries]; results['bplus_range_time_unsorted'] = time.perf_counter() - t_start
-        t_start = time.perf_counter(); [bplus_sort.range_query(s, e) for s,e in queries]; results['bplus_range_time_sorted'] = time.perf_counter() - t_start
-        t_start = time.perf_counter(); [bf_db.range_query(s, e) for s,e in queries]; results['bf_range_time'] = time.perf_counter() - t_start
+        if np is not None: # Same distributions as the loop below, drawn as two arrays
+             rng = np.random.default_rng(random.getrandbits(64))
+             r_sizes = rng.integers(1, max(2, span // 20), size=num_queries, endpoint=True)
+             s_ks = rng.integers(min_k, np.maximum(min_k, max_k - r_sizes), endpoint=True)
+             queries = list(zip(s_ks.tolist(), (s_ks + r_sizes).tolist()))
+        else:
+             queries = []
+             for _ in range(num_queries):
+                  r_size = random.randint(1, max(2, span // 20)); s_k = random.randint(min_k, max(min_k, max_k - r_size)); e_k = s_k + r_size; queries.append((s_k, e_k))
+        t_start = time.perf_counter_ns(); _drain(chain.from_iterable(starmap(bplus_uns.range_query, queries))); results['bplus_range_time_unsorted'] = (time.perf_counter_ns() - t_start) * 1e-9
+        t_start = time.perf_counter_ns(); _drain(chain.from_iterable(starmap(bplus_sort.range_query, queries))); results['bplus_range_time_sorted'] = (time.perf_counter_ns() - t_start) * 1e-9
+        t_start = time.perf_counter_ns(); _drain(starmap(bf_db.range_query, queries)); results['bf_range_time'] = (time.perf_counter_ns() - t_start) * 1e-9
         del bplus_uns, bplus_sort, bf_db; return results
 
     def run_delete_test(self, data_size, btree_order, delete_percentage=20): # Lower %
@@ -124,10 +207,16 @@ class PerformanceAnalyzer:
         keys_to_delete = random.sample(keys_present, k=min(num_to_delete, len(keys_present)))
         keys_b_uns = list(keys_to_delete); keys_b_sort = list(keys_to_delete); keys_f = list(keys_to_delete)
         random.shuffle(keys_b_uns); random.shuffle(keys_b_sort); random.shuffle(keys_f)
-        t_start = time.perf_counter(); [bplus_uns.delete(k) for k in keys_b_uns]; results['bplus_delete_time_unsorted'] = time.perf_counter() - t_start
-        t_start = time.perf_counter(); [bplus_sort.delete(k) for k in keys_b_sort]; results['bplus_delete_time_sorted'] = time.perf_counter() - t_start
-        t_start = time.perf_counter(); [bf_db.delete(k) for k in keys_f]; results['bf_delete_time'] = time.perf_counter() - t_start
-        del bplus_uns, bplus_sort, bf_db; return results
+        t_start = time.perf_counter_ns(); _drain(map(bplus_uns.delete, keys_b_uns)); results['bplus_delete_time_unsorted'] = (time.perf_counter_ns() - t_start) * 1e-9
+        t_start = time.perf_counter_ns(); _drain(map(bplus_sort.delete, keys_b_sort)); results['bplus_delete_time_sorted'] = (time.perf_counter_ns() - t_start) * 1e-9
+        t_start = time.perf_counter_ns(); _drain(map(bf_db.delete, keys_f)); results['bf_delete_time'] = (time.perf_counter_ns() - t_start) * 1e-9
+        del bplus_uns, bplus_sort, bf_db
+        # Batch API on freshly built trees (the ones above have already been deleted from)
+        bplus_uns, bplus_sort, _, keys_present = self._setup_all_for_timing(data_size, btree_order)
+        keys_to_delete = random.sample(keys_present, k=min(num_to_delete, len(keys_present)))
+        t_start = time.perf_counter_ns(); bplus_uns.delete_many(keys_to_delete); results['bplus_delete_batch_time_unsorted'] = (time.perf_counter_ns() - t_start) * 1e-9
+        t_start = time.perf_counter_ns(); bplus_sort.delete_many(keys_to_delete); results['bplus_delete_batch_time_sorted'] = (time.perf_counter_ns() - t_start) * 1e-9
+        del bplus_uns, bplus_sort; return results
 
     def run_update_test(self, data_size, btree_order):
         """Tests update time."""
@@ -138,11 +227,32 @@ class PerformanceAnalyzer:
         sample_size = min(len(keys_present), max(500, len(keys_present)//10)) # Smaller sample
         keys_to_update = random.sample(keys_present, k=sample_size)
         new_vals = [f"upd_{k}" for k in keys_to_update] # Consistent new values
-        t_start = time.perf_counter(); [bplus_uns.update(k, v) for k, v in zip(keys_to_update, new_vals)]; results['bplus_update_time_unsorted'] = time.perf_counter() - t_start
-        t_start = time.perf_counter(); [bplus_sort.update(k, v) for k, v in zip(keys_to_update, new_vals)]; results['bplus_update_time_sorted'] = time.perf_counter() - t_start
-        t_start = time.perf_counter(); [bf_db.update(k, v) for k, v in zip(keys_to_update, new_vals)]; results['bf_update_time'] = time.perf_counter() - t_start
+        t_start = time.perf_counter_ns(); _drain(map(bplus_uns.update, keys_to_update, new_vals)); results['bplus_update_time_unsorted'] = (time.perf_counter_ns() - t_start) * 1e-9
+        t_start = time.perf_counter_ns(); _drain(map(bplus_sort.update, keys_to_update, new_vals)); results['bplus_update_time_sorted'] = (time.perf_counter_ns() - t_start) * 1e-9
+        t_start = time.perf_counter_ns(); _drain(map(bf_db.update, keys_to_update, new_vals)); results['bf_update_time'] = (time.perf_counter_ns() - t_start) * 1e-9
+        update_pairs = list(zip(keys_to_update, new_vals))
+        t_start = time.perf_counter_ns(); bplus_uns.update_many(update_pairs); results['bplus_update_batch_time_unsorted'] = (time.perf_counter_ns() - t_start) * 1e-9
+        t_start = time.perf_counter_ns(); bplus_sort.update_many(update_pairs); results['bplus_update_batch_time_sorted'] = (time.perf_counter_ns() - t_start) * 1e-9
         del bplus_uns, bplus_sort, bf_db; return results
 
+    # Mix-test op codes, stored in an array('b') next to an array('q') of keys
+    _INSERT, _SEARCH, _UPDATE, _DELETE = range(4)
+
+    @classmethod
+    def _time_ops(cls, db, op_codes, op_keys):
+        """
+        Replays the encoded ops against db and returns the elapsed time.
+        Each op is resolved to its bound method and arguments (insert and update
+        values are derived from the key) before the clock starts, so the timed
+        loop is one call per op instead of an if/elif chain.
+        """
+        methods = (db.insert, db.search, db.update, db.delete)
+        calls = [(methods[code], (key, f"v_{key}") if code == cls._INSERT else (key, f"upd_{key}") if code == cls._UPDATE else (key,))
+                 for code, key in zip(op_codes, op_keys)]
+        t_start = time.perf_counter_ns()
+        for method, args in calls: method(*args)
+        return (time.perf_counter_ns() - t_start) * 1e-9
+
     def run_random_mix_test(self, data_size, btree_order, num_operations_factor=0.3): # Lower factor
         """Tests time for a random mix of operations."""
         print(f"    Mix Test (Size:{data_size}, Order:{btree_order})...")
@@ -150,44 +260,24 @@ class PerformanceAnalyzer:
         if not keys_initial: return {'bplus_mix_time_unsorted': 0, 'bplus_mix_time_sorted': 0, 'bf_mix_time': 0}
         results = {}
         num_operations = int(data_size * num_operations_factor)
-        ops = []; op_keys_basis = set(keys_initial); max_key_val = data_size * 3
+        INSERT, SEARCH, UPDATE, DELETE = self._INSERT, self._SEARCH, self._UPDATE, self._DELETE
+        op_codes = array('b'); op_keys = array('q'); max_key_val = data_size * 3
+        op_keys_basis = list(set(keys_initial)) # Keys not yet deleted; picked by index, removed by swap-pop
         for _ in range(num_operations): # Generate ops
              op_type = random.choice(['insert', 'search', 'delete', 'update'])
-             key = None
-             if op_type == 'insert': key = random.randint(1, max_key_val); ops.append(('insert', key, f"v_{key}"))
-             elif op_type == 'search': key = random.randint(1, max_key_val) if random.random() < 0.3 or not op_keys_basis else random.choice(list(op_keys_basis)); ops.append(('search', key))
+             if op_type == 'insert': code, key = INSERT, random.randint(1, max_key_val)
+             elif op_type == 'search': code, key = SEARCH, random.randint(1, max_key_val) if random.random() < 0.3 or not op_keys_basis else random.choice(op_keys_basis)
              elif op_type == 'update':
-                  if op_keys_basis: key = random.choice(list(op_keys_basis)); ops.append(('update', key, f"upd_{key}"))
-                  else: key = random.randint(1, max_key_val); ops.append(('insert', key, f"v_{key}"))
+                  if op_keys_basis: code, key = UPDATE, random.choice(op_keys_basis)
+                  else: code, key = INSERT, random.randint(1, max_key_val)
              else: # delete
-                  if op_keys_basis: key = random.choice(list(op_keys_basis)); ops.append(('delete', key)); op_keys_basis.discard(key)
-                  else: key = random.randint(1, max_key_val); ops.append(('insert', key, f"v_{key}"))
-        # Time B+ Unsorted Mix
-        t_start = time.perf_counter()
-        for op in ops:
-            op_type, key = op[0], op[1]; val = op[2] if len(op)>2 else None
-            if op_type == 'insert': bplus_uns.insert(key, val)
-            elif op_type == 'search': bplus_uns.search(key)
-            elif op_type == 'update': bplus_uns.update(key, val)
-            elif op_type == 'delete': bplus_uns.delete(key)
-        results['bplus_mix_time_unsorted'] = time.perf_counter() - t_start
-        # Time B+ Sorted Mix
-        t_start = time.perf_counter()
-        for op in ops:
-            op_type, key = op[0], op[1]; val = op[2] if len(op)>2 else None
-            if op_type == 'insert': bplus_sort.insert(key, val)
-            elif op_type == 'search': bplus_sort.search(key)
-            elif op_type == 'update': bplus_sort.update(key, val)
-            elif op_type == 'delete': bplus_sort.delete(key)
-        results['bplus_mix_time_sorted'] = time.perf_counter() - t_start
-        # Time Brute Force Mix
-        t_start = time.perf_counter()
-        for op in ops:
-             op_type, key = op[0], op[1]; val = op[2] if len(op)>2 else None
-             if op_type == 'insert': bf_db.insert(key, val)
-             elif op_type == 'search': bf_db.search(key)
-             elif op_type == 'update': bf_db.update(key, val)
-             elif op_type == 'delete': bf_db.delete(key)
-        results['bf_mix_time'] = time.perf_counter() - t_start
+                  if op_keys_basis:
+                       idx = random.randrange(len(op_keys_basis)); code, key = DELETE, op_keys_basis[idx]
+                       op_keys_basis[idx] = op_keys_basis[-1]; op_keys_basis.pop()
+                  else: code, key = INSERT, random.randint(1, max_key_val)
+             op_codes.append(code); op_keys.append(key)
+        results['bplus_mix_time_unsorted'] = self._time_ops(bplus_uns, op_codes, op_keys)
+        results['bplus_mix_time_sorted'] = self._time_ops(bplus_sort, op_codes, op_keys)
+        results['bf_mix_time'] = self._time_ops(bf_db, op_codes, op_keys)
         print(f"      Mix (B+U/B+S/BF): {results['bplus_mix_time_unsorted']:.4f}s / {results['bplus_mix_time_sorted']:.4f}s / {results['bf_mix_time']:.4f}s")
         del bplus_uns, bplus_sort, bf_db; return results
\ No newline at end of file
@@ -1,13 +1,22 @@
 # File: db_management_system/database/table.py
 
+from collections import OrderedDict
+from operator import itemgetter
+
 from .bplustree import BPlusTree  # Import the BPlusTree implementation
 
 class Table:
     """
     Represents a table in the database, using a B+ Tree for indexing.
     Stores records as dictionaries and uses a specified search_key for the B+ Tree.
+    Attributes live in __slots__ (no per-instance __dict__).
     """
-    def __init__(self, name, schema, order=8, search_key=None):
+    # Node size targeted by auto_order=True: four 64-byte cache lines
+    AUTO_ORDER_BYTES = 256
+    # Persistent state first; the rest is derived and rebuilt by __setstate__
+    _STATE = ('name', 'schema', 'order', 'search_key', 'cache_size', 'data')
+    __slots__ = _STATE + ('_coercers', '_validation_items', '_required_cols', '_cache', '_cache_version')
+    def __init__(self, name, schema, order=8, search_key=None, cache_size=128, auto_order=False):
         """
         Initializes a new Table.
 
@@ -18,7 +27,14 @@ class Table:
             order (int): The order for the underlying B+ Tree index.
             search_key (str): The column name from the schema to be used as the
                               primary key for the B+ Tree index. Must be provided.
+            cache_size (int): How many records get() keeps in an LRU cache in front
+                              of the B+ Tree; 0 or None disables the cache.
+            auto_order (bool): Ignore `order` and use AUTO_ORDER_BYTES-sized nodes instead.
         """
+        if auto_order:
+            # A node holds two pointer lists (keys, values): 16 bytes per entry whatever
+            # the record size, since records live outside the node as dicts
+            order = BPlusTree.auto_order(target_bytes=self.AUTO_ORDER_BYTES, item_size=16)
         if not isinstance(name, str) or not name:
             raise ValueError("Table name must be a non-empty string.")
         if not isinstance(schema, dict) or not schema:
@@ -34,10 +50,97 @@ class Table:
         self.schema = schema
         self.order = order
         self.search_key = search_key
+        self.cache_size = cache_size
         # The B+ Tree stores: key = record[search_key], value = entire record dictionary
         self.data = BPlusTree(order=self.order)
+        self._compile_schema()
+        self._reset_cache()
         print(f"Table '{self.name}' created with search key '{self.search_key}'.")
 
+    @classmethod
+    def from_saved(cls, name, schema, order, search_key, tree):
+        """
+        Rebuilds a Table around an already-populated B+ Tree (used when loading
+        saved state), skipping constructor validation and the empty initial tree.
+
+        Args:
+            name (str): The table name.
+            schema (dict): Column names mapped to their Python types.
+            order (int): The B+ Tree order.
+            search_key (str): The indexed column.
+            tree (BPlusTree): The table's restored index.
+
+        Returns:
+            Table: The restored table.
+        """
+        table = cls.__new__(cls)
+        table.__setstate__({"name": name, "schema": schema, "order": order, "search_key": search_key, "data": tree})
+        return table
+
+    def __getstate__(self):
+        """Pickles the persistent attributes only (no schema helpers, no get() cache)."""
+        return {name: getattr(self, name) for name in self._STATE}
+
+    def __setstate__(self, state):
+        """
+        Restores a pickled Table, including the __dict__ of tables saved before
+        __slots__, and rebuilds schema-derived helpers and the cache.
+        """
+        self.cache_size = 128 # Older saves predate the cache
+        for name in self._STATE:
+            if name in state: setattr(self, name, state[name])
+        self._compile_schema()
+        self._reset_cache()
+
+    def _reset_cache(self):
+        """
+        Empties the get() cache. The cache is valid for one tree version: writes made
+        through this Table patch the affected key and move it to the new version, any
+        other change to self.data (e.g. direct tree calls) makes get() drop it.
+        """
+        self._cache = OrderedDict() if self.cache_size else None
+        self._cache_version = self.data.version
+
+    def _cache_after_write(self, version_before, key, record=None):
+        """
+        Keeps the cache in step with a write this Table just made to `key`: an
+        updated record replaces the cached one, a deleted record (record=None) is dropped.
+        """
+        cache = self._cache
+        if cache is None or self._cache_version != version_before: return # Already stale
+        if record is None: cache.pop(key, None)
+        elif key in cache: cache[key] = record
+        self._cache_version = self.data.version
+
+    def _compile_schema(self):
+        """
+        Precomputes per-table helpers from the schema once, so per-record paths
+        don't re-walk self.schema.items() on every call.
+        """
+        # (column, type) pairs used by coerce_record
+        self._coercers = tuple(self.schema.items())
+        # (column, accepted types, declared type name) for _validate_record; ints are valid floats
+        self._validation_items = tuple(
+            (col_name, (int, float) if col_type is float else col_type, col_type.__name__)
+            for col_name, col_type in self.schema.items())
+        self._required_cols = frozenset(self.schema)
+
+    def coerce_record(self, record):
+        """
+        Converts each schema column of a raw record to the column's declared type.
+
+        Args:
+            record (dict): Raw values keyed by column name (e.g. from form widgets).
+
+        Returns:
+            dict: A new record containing exactly the schema columns, converted.
+
+        Raises:
+            KeyError: If a schema column is missing from the record.
+            ValueError: If a value cannot be converted to its column type.
+        """
+        return {col_name: col_type(record[col_name]) for col_name, col_type in self._coercers}
+
     def _validate_record(self, record):
         """
         Validates a record against the table's schema.
@@ -52,32 +155,39 @@ class Table:
         if not isinstance(record, dict):
             return False, "Record must be a dictionary."
 
-        # Check for missing columns defined in schema
-        for col_name in self.schema:
-            if col_name not in record:
-                return False, f"Record missing required column: '{col_name}'."
+        # Check for missing columns defined in schema (one C-level subset test; the
+        # loop only runs to name the first missing column, in schema order)
+        if not self._required_cols <= record.keys():
+            col_name = next(col for col in self.schema if col not in record)
+            return False, f"Record missing required column: '{col_name}'."
 
         # Check for extra columns not in schema (optional, can be strict or lenient)
         # for col_name in record:
         #     if col_name not in self.schema:
         #         return False, f"Record contains undefined column: '{col_name}'."
 
-        # Check data types
-        for col_name, expected_type in self.schema.items():
-            if col_name in record: # Check only if column exists (allows partial updates later if needed)
-                value = record[col_name]
-                if not isinstance(value, expected_type):
-                    # Allow int to be treated as float if expected type is float
-                    if expected_type == float and isinstance(value, int):
-                        continue # Treat int as valid float
-                    return False, f"Incorrect type for column '{col_name}'. Expected {expected_type.__name__}, got {type(value).__name__}."
-
-        # Check if search key exists in the record
-        if self.search_key not in record:
-             return False, f"Record must contain the search key field '{self.search_key}'."
+        # Check data types (every column is present at this point)
+        for col_name, accepted_types, type_name in self._validation_items:
+            value = record[col_name]
+            if not isinstance(value, accepted_types):
+                return False, f"Incorrect type for column '{col_name}'. Expected {type_name}, got {type(value).__name__}."
 
         return True, None
 
+    def _key_error(self, key):
+        """
+        Checks that a search key value can be stored in the B+ Tree.
+
+        Returns:
+            str: An error message for a None or NaN key (NaN never compares equal,
+                 so it could not be found or ordered), None otherwise.
+        """
+        if key is None: # Only reachable if the key column's declared type admits None
+            return f"Search key '{self.search_key}' has None value in record."
+        if key != key:
+            return f"Search key '{self.search_key}' has NaN value in record."
+        return None
+
     def insert(self, record):
         """
         Inserts a record into the table.
@@ -94,29 +204,65 @@ class Table:
             # print(f"Insert failed for table '{self.name}': {error_msg}")
             return False, error_msg
 
-        key = record.get(self.search_key) # Get the value of the search key field
-        if key is None: # Should be caught by validation, but double-check
-             msg = f"Search key '{self.search_key}' has None value in record."
+        key = record[self.search_key] # Present: validation checked every schema column
+        msg = self._key_error(key)
+        if msg is not None:
              # print(f"Insert failed for table '{self.name}': {msg}")
              return False, msg
 
-        # Check if key already exists (B+ Tree search is efficient)
-        if self.data.search(key) is not None:
+        # Insert the key and the entire record dictionary into the B+ Tree; the duplicate
+        # check happens in the same descent
+        tree = self.data # Local: read twice on the success path
+        version_before = tree.version
+        if not tree.insert_if_absent(key, record):
             msg = f"Duplicate key error: Record with {self.search_key} = {key} already exists."
             # print(f"Insert failed for table '{self.name}': {msg}")
             return False, msg
+        # print(f"Inserted record with key {key} into table '{self.name}'.")
+        self._cache_after_write(version_before, key) # Only hits are cached, so nothing to evict; just stay current
+        return True, None
 
-        # Insert the key and the entire record dictionary into the B+ Tree
-        try:
-            self.data.insert(key, record)
-            # print(f"Inserted record with key {key} into table '{self.name}'.")
-            return True, None
-        except Exception as e:
-            # Catch potential internal B+ Tree errors if any
-            msg = f"Internal B+ Tree error during insert: {e}"
-            # print(f"Insert failed for table '{self.name}': {msg}")
-            return False, msg
+    def bulk_insert(self, records):
+        """
+        Inserts many records at once. Every record is validated first and
+        nothing is inserted if any record is invalid or any key is duplicated.
+        The records go into the tree with BPlusTree.insert_many, which builds
+        an empty table bottom-up and otherwise inserts in key order.
 
+        Args:
+            records (list): A list of record dictionaries.
+
+        Returns:
+            bool: True if all records were inserted, False otherwise.
+            str: An error message if insertion failed, None otherwise.
+        """
+        keyed_records = []
+        for record in records:
+            is_valid, error_msg = self._validate_record(record)
+            if not is_valid:
+                return False, f"Invalid record {record}: {error_msg}"
+            key = record[self.search_key]
+            error_msg = self._key_error(key)
+            if error_msg is not None: # Checked before sorting: NaN keys would leave the batch unordered
+                return False, f"Invalid record {record}: {error_msg}"
+            keyed_records.append((key, record))
+
+        keyed_records.sort(key=itemgetter(0))
+        for (prev_key, _), (key, _) in zip(keyed_records, keyed_records[1:]):
+            if prev_key == key:
+                return False, f"Duplicate key error: {self.search_key} = {key} appears more than once in the batch."
+
+        if not self.data.is_empty():
+            # One batched lookup over the sorted keys instead of a root descent per key
+            existing = self.data.search_many([key for key, _ in keyed_records])
+            for (key, _), found in zip(keyed_records, existing):
+                if found is not None:
+                    return False, f"Duplicate key error: Record with {self.search_key} = {key} already exists."
+        version_before = self.data.version
+        self.data.insert_many(keyed_records, presorted=True) # Sorted and checked for duplicates above
+        if self._cache is not None and self._cache_version == version_before: # New keys only; cached records unchanged
+            self._cache_version = self.data.version
+        return True, None
 
     def get(self, record_id):
         """
@@ -129,8 +275,19 @@ class Table:
             dict: The record dictionary if found, None otherwise.
             bool: True if found, False otherwise.
         """
-        record_data = self.data.search(record_id)
+        cache, tree = self._cache, self.data # Locals for the hit and miss paths
+        if cache is not None:
+            if self._cache_version != tree.version: # Tree changed behind the Table's back
+                cache.clear(); self._cache_version = tree.version
+            record_data = cache.get(record_id)
+            if record_data is not None:
+                cache.move_to_end(record_id)
+                return record_data, True
+        record_data = tree.search(record_id)
         if record_data is not None:
+            if cache is not None:
+                cache[record_id] = record_data
+                if len(cache) > self.cache_size: cache.popitem(last=False) # Evict least recently used
             return record_data, True
         else:
             return None, False
@@ -143,10 +300,41 @@ class Table:
             list: A list of all record dictionaries stored in the table.
             bool: Always True (unless an internal error occurs, which is unlikely here).
         """
-        # self.data.get_all() returns list of (key, value) tuples
-        # We only want the values (which are the record dictionaries)
-        all_records = [record for key, record in self.data.get_all()]
-        return all_records, True
+        return list(self.data.iter_values()), True
+
+    def iter_all(self):
+        """
+        Iterates over all records in search-key order without building a list.
+        The table must not be modified while the iterator is in use.
+
+        Returns:
+            iterator: The record dictionaries.
+        """
+        return self.data.iter_values()
+
+    def count(self):
+        """
+        Returns the number of records stored in the table.
+
+        Returns:
+            int: The record count.
+        """
+        return self.data.count()
+
+    def get_range_by_offset(self, offset, limit):
+        """
+        Retrieves one page of records in search-key order, walking the B+ Tree leaves.
+
+        Args:
+            offset (int): Number of records to skip from the start of the table.
+            limit (int): Maximum number of records to return.
+
+        Returns:
+            list: Up to `limit` record dictionaries.
+            bool: Always True (unless an internal error occurs).
+        """
+        page_records = [record for key, record in self.data.get_page(offset, limit)]
+        return page_records, True
 
     def update(self, record_id, new_record_data):
         """
@@ -162,32 +350,77 @@ class Table:
             bool: True if the update was successful, False otherwise.
             str: An error message if update failed, None otherwise.
         """
-        # 1. Check if record exists
-        existing_record, found = self.get(record_id)
-        if not found:
-            msg = f"Record with {self.search_key} = {record_id} not found for update."
-            return False, msg
-
-        # 2. Validate the new data
         is_valid, error_msg = self._validate_record(new_record_data)
         if not is_valid:
+            # Report a missing record ahead of invalid data
+            if self.data.search(record_id) is None:
+                return False, f"Record with {self.search_key} = {record_id} not found for update."
             return False, f"Invalid new record data: {error_msg}"
+        return self._update_unchecked(record_id, new_record_data)
+
+    def _update_unchecked(self, record_id, new_record_data):
+        """
+        update() for data that has already passed _validate_record: checks that the
+        search key is unchanged and replaces the record in one B+ Tree descent.
 
-        # 3. Ensure the search key is not being changed
-        if new_record_data.get(self.search_key) != record_id:
-            msg = f"Updating the search key ('{self.search_key}') is not allowed via update. Key must remain {record_id}."
+        Returns:
+            bool: True if the update was successful, False otherwise.
+            str: An error message if update failed, None otherwise.
+        """
+        tree = self.data
+        version_before = tree.version
+        new_key = new_record_data[self.search_key]
+        # `is` first: callers usually pass the very object stored in the record (small ints, same str)
+        if (new_key is record_id or new_key == record_id) and tree.update(record_id, new_record_data):
+            self._cache_after_write(version_before, record_id, new_record_data)
+            return True, None
+
+        # Failure: a missing record is reported ahead of a changed key
+        if tree.search(record_id) is None:
+            msg = f"Record with {self.search_key} = {record_id} not found for update."
             return False, msg
+        msg = f"Updating the search key ('{self.search_key}') is not allowed via update. Key must remain {record_id}."
+        return False, msg
 
-        # 4. Perform the update in the B+ Tree
-        # B+ Tree update replaces the value associated with the key
-        updated = self.data.update(record_id, new_record_data)
+    def bulk_update(self, records):
+        """
+        Replaces many records at once, each identified by its own search_key value.
+        Every record is validated and every key looked up first; nothing is updated
+        if any record is invalid or any key is not in the table. The records then go
+        into the tree with BPlusTree.update_many.
 
-        if updated:
-            return True, None
-        else:
-            # This case might happen if the key mysteriously disappears between search and update (unlikely in single thread)
-            # Or if BPlusTree.update implementation has issues.
-            return False, f"Internal B+ Tree error during update for key {record_id}."
+        Args:
+            records (list): A list of complete record dictionaries.
+
+        Returns:
+            bool: True if all records were updated, False otherwise.
+            str: An error message if the update failed, None otherwise.
+        """
+        keyed_records = []
+        for record in records:
+            is_valid, error_msg = self._validate_record(record)
+            if not is_valid:
+                return False, f"Invalid record {record}: {error_msg}"
+            key = record[self.search_key]
+            error_msg = self._key_error(key)
+            if error_msg is not None: # Checked before sorting: NaN keys would leave the batch unordered
+                return False, f"Invalid record {record}: {error_msg}"
+            keyed_records.append((key, record))
+
+        tree = self.data
+        existing = tree.search_many([key for key, _ in keyed_records])
+        for (key, _), found in zip(keyed_records, existing):
+            if found is None:
+                return False, f"Record with {self.search_key} = {key} not found for update."
+
+        version_before = tree.version
+        tree.update_many(keyed_records)
+        cache = self._cache
+        if cache is not None and self._cache_version == version_before:
+            for key, record in keyed_records:
+                if key in cache: cache[key] = record
+            self._cache_version = tree.version
+        return True, None
 
     def delete(self, record_id):
         """
@@ -200,8 +433,11 @@ class Table:
             bool: True if deletion was successful, False if the record was not found.
             str: An error message if deletion failed for other reasons, None otherwise.
         """
-        deleted = self.data.delete(record_id)
+        tree = self.data
+        version_before = tree.version
+        deleted = tree.delete(record_id)
         if deleted:
+            self._cache_after_write(version_before, record_id)
             return True, None
         else:
             msg = f"Record with {self.search_key} = {record_id} not found for deletion."
@@ -220,6 +456,19 @@ class Table:
             list: A list of record dictionaries matching the range criteria.
             bool: Always True (unless internal B+ Tree error).
         """
-        # self.data.range_query returns list of (key, value) tuples
-        matching_records = [record for key, record in self.data.range_query(start_value, end_value)]
-        return matching_records, True
\ No newline at end of file
+        return self.data.range_values(start_value, end_value), True
+
+    def iter_range(self, start_value, end_value):
+        """
+        Iterates over the records whose search_key falls within [start_value, end_value],
+        in key order, without building a list. The table must not be modified while
+        the iterator is in use.
+
+        Args:
+            start_value: The minimum value for the search_key (inclusive).
+            end_value: The maximum value for the search_key (inclusive).
+
+        Returns:
+            iterator: The matching record dictionaries.
+        """
+        return self.data.iter_range_values(start_value, end_value)
\ No newline at end of file